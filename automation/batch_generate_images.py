@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 """
 LogiShift Batch Hero Image Generator
-Generates missing hero images for existing cluster articles using DALL-E 3.
+Generates missing hero images for existing cluster articles.
+Prompt and image generation run concurrently (see GeminiClient.generate_images_batch).
 """
+import argparse
 import os
 import sys
 import re
@@ -12,36 +14,35 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client
 except ImportError:
-    from gemini_client import GeminiClient
+    from gemini_client import get_client
 
-def generate_images_for_existing():
+def generate_images_for_existing(max_workers=4):
     output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated_articles")
     
     if not os.path.exists(output_dir):
         print(f"Directory not found: {output_dir}")
         return
 
-    gemini = GeminiClient()
+    gemini = get_client()
     date_str = datetime.now().strftime("%Y-%m-%d")
 
     # Find all generated markdown files for cluster articles
     md_files = [f for f in os.listdir(output_dir) if f.endswith('.md') and date_str in f]
     
+    jobs = []
     for filename in md_files:
         filepath = os.path.join(output_dir, filename)
         target_key = filename.replace(f"{date_str}_", "").replace(".md", "")
         image_filename = f"{date_str}_{target_key}_hero.png"
         image_path = os.path.join(output_dir, image_filename)
         
-        # Skip if image already exists
-        if os.path.exists(image_path):
+        # Skip if image already exists (the PNG is replaced by a WebP once uploaded)
+        if os.path.exists(image_path) or os.path.exists(image_path[:-len(".png")] + ".webp"):
             print(f"⏩ Image already exists for {target_key}, skipping.")
             continue
             
-        print(f"\nProcessing: {filename}")
-        
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
             
@@ -52,24 +53,31 @@ def generate_images_for_existing():
         else:
             title = target_key
             
-        print(f"Title: {title}")
-        
-        # Generate image
-        try:
-            content_summary = content[:1000]
-            print("Requesting image prompt from Gemini...")
-            image_prompt = gemini.generate_image_prompt(title, content_summary, "Cluster Article")
-            
-            print(f"Generating image via DALL-E 3: {image_filename}")
-            generated_img = gemini.generate_image(image_prompt, image_path, aspect_ratio="16:9")
-            
-            if generated_img:
-                print(f"✅ Success: {image_filename}")
-            else:
-                print(f"❌ Failed: {image_filename}")
-                
-        except Exception as e:
-            print(f"⚠️ Error: {e}")
+        print(f"Queued: {filename} (Title: {title})")
+        jobs.append({
+            "title": title,
+            "content_summary": content[:1000],
+            "article_type": "Cluster Article",
+            "output_path": image_path
+        })
+
+    if not jobs:
+        print("No missing hero images.")
+        return
+
+    print(f"\nGenerating {len(jobs)} hero image(s) with up to {max_workers} in parallel...")
+    results = gemini.generate_images_batch(jobs, max_workers=max_workers, aspect_ratio="16:9")
+    
+    for job in jobs:
+        image_filename = os.path.basename(job["output_path"])
+        if results.get(job["output_path"]):
+            print(f"✅ Success: {image_filename}")
+        else:
+            print(f"❌ Failed: {image_filename}")
 
 if __name__ == "__main__":
-    generate_images_for_existing()
+    parser = argparse.ArgumentParser(description="Generate missing hero images for today's articles.")
+    parser.add_argument("--workers", type=int, default=4, help="Max concurrent image jobs (default: 4)")
+    args = parser.parse_args()
+    
+    generate_images_for_existing(max_workers=args.workers)
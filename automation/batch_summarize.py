@@ -4,136 +4,217 @@ Batch Summarizer for LogiShift
 
 Iterates through all existing WordPress posts and generates structured AI summaries
 if they are missing. Stores the result in the `_ai_structured_summary` custom field.
+
+Resumable backfill:
+- Posts are paged through oldest first (100 per request), so the whole archive is covered
+- Summaries are generated by a bounded pool of workers (--workers); the GeminiClient
+  retry/fallback logic handles rate limits instead of a fixed sleep per post
+- Summaries are written back in batches through the REST batch endpoint (--batch-size
+  posts per request)
+- Progress is saved after every post to a checkpoint file: the publication date up to
+  which every post is done, plus the IDs that failed. A rerun continues from there and
+  retries the failed posts first (--restart starts over)
 """
+import os
 import sys
 import json
-import time
-from typing import List, Dict
+import re
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 try:
-    from automation.gemini_client import GeminiClient
-    from automation.wp_client import WordPressClient
+    from automation.gemini_client import get_client
+    from automation.wp_client import WordPressClient, META_BATCH_SIZE
 except ImportError:
-    from gemini_client import GeminiClient
-    from wp_client import WordPressClient
+    from gemini_client import get_client
+    from wp_client import WordPressClient, META_BATCH_SIZE
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_summarize_state.json")
+
+POST_FIELDS = ["id", "date", "title", "content", "meta"]
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"cursor": None, "failed": []}
+    state.setdefault("cursor", None)
+    state.setdefault("failed", [])
+    return state
+
+
+def save_checkpoint(path, state):
+    """Write the checkpoint atomically so an interrupted run never leaves it half-written."""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Failed to save checkpoint: {e}")
+
+
+def has_summary(post):
+    meta = post.get('meta') or {}
+    return bool(meta.get('ai_structured_summary'))
+
+
+def summarize_post(gemini, post):
+    """Generate the structured summary of one post. Returns the meta value (JSON string) or None."""
+    # Strip HTML from content for token efficiency
+    text_content = re.sub('<[^<]+?>', '', post['content']['rendered'])
+    summary_json = gemini.generate_structured_summary(text_content)
+    if not summary_json:
+        print(f"  - [{post['id']}] Failed to generate summary (Gemini returned None).")
+        return None
+    return json.dumps(summary_json, ensure_ascii=False)
+
+
+def iter_targets(wp, state, restart=False):
+    """
+    Yield (post, counts_for_cursor): first the posts that failed last time, then
+    every post published after the checkpoint cursor, oldest first.
+    """
+    retry_ids = [] if restart else list(state["failed"])
+    if retry_ids:
+        print(f"Retrying {len(retry_ids)} posts that failed in the previous run...")
+        for start in range(0, len(retry_ids), 100):
+            for post in wp.iter_posts(status="publish", include=retry_ids[start:start + 100], fields=POST_FIELDS):
+                yield post, False
+
+    after = None
+    if state["cursor"] and not restart:
+        # WordPress 'after' is exclusive; step back a second so posts sharing the
+        # cursor timestamp are seen again (already summarized ones are skipped cheaply)
+        after = (datetime.fromisoformat(state["cursor"]) - timedelta(seconds=1)).isoformat()
+        print(f"Resuming after {state['cursor']}")
+    for post in wp.iter_posts(status="publish", after=after, fields=POST_FIELDS, order="asc"):
+        yield post, True
+
+
+def run_backfill(gemini, wp, checkpoint_path=DEFAULT_CHECKPOINT_PATH, workers=4, limit=None, restart=False, force=False,
+                 batch_size=META_BATCH_SIZE):
+    """
+    Summarize every published post missing a structured summary (or all with force).
+    Summaries are written back batch_size posts per request (WordPress /batch/v1).
+    Returns a dict of counts: updated, skipped, failed.
+    """
+    state = {"cursor": None, "failed": []} if restart else load_checkpoint(checkpoint_path)
+    retrying = set(state["failed"])
+    failed = set() if restart else set(state["failed"])
+    counts = {"updated": 0, "skipped": 0, "failed": 0}
+    submitted = 0
+
+    # Futures in submission (= publication) order; results are consumed in that order so
+    # the cursor only moves past posts whose predecessors are all finished
+    pending = deque()
+    # Generated summaries waiting to be written in one batch request
+    unsaved = []
+    # Cursor position reached by consumed results; committed once nothing before it is unsaved
+    reached = {"cursor": state["cursor"]}
+
+    def commit():
+        if not unsaved:
+            state["cursor"] = reached["cursor"]
+        state["failed"] = sorted(failed)
+        save_checkpoint(checkpoint_path, state)
+
+    def mark(post, ok):
+        if ok:
+            counts["updated"] += 1
+            failed.discard(post['id'])
+            print(f"  - [{post['id']}] Summary stored: {post['title']['rendered']}")
+        else:
+            counts["failed"] += 1
+            failed.add(post['id'])
+
+    def flush():
+        if not unsaved:
+            return
+        results = wp.update_posts_meta([(post['id'], {"ai_structured_summary": value}) for post, value in unsaved],
+                                       batch_size=batch_size)
+        for post, _ in unsaved:
+            mark(post, results.get(post['id'], False))
+        unsaved.clear()
+        commit()
+
+    def finish_oldest():
+        post, advances_cursor, future = pending.popleft()
+        try:
+            value = future.result()
+        except Exception as e:
+            print(f"  - [{post['id']}] Error: {e}")
+            value = None
+        if value:
+            unsaved.append((post, value))
+        else:
+            mark(post, False)
+        if advances_cursor:
+            reached["cursor"] = post['date']
+        if len(unsaved) >= batch_size:
+            flush()
+        else:
+            commit()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for post, advances_cursor in iter_targets(wp, state, restart=restart):
+            if advances_cursor and post['id'] in retrying:
+                continue  # Already handled in the retry pass
+            if has_summary(post) and not force:
+                counts["skipped"] += 1
+                failed.discard(post['id'])
+                if advances_cursor and not pending:
+                    reached["cursor"] = post['date']
+                continue
+            if limit is not None and submitted >= limit:
+                break
+            submitted += 1
+            pending.append((post, advances_cursor, executor.submit(summarize_post, gemini, post)))
+            # Keep a bounded window of posts in flight (pages are fetched lazily)
+            while len(pending) >= workers * 2:
+                finish_oldest()
+        while pending:
+            finish_oldest()
+        flush()
+
+    commit()
+    return counts
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Backfill AI structured summaries for existing posts")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent summary generations (default: 4)")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of posts to summarize in this run")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="Progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the oldest post")
+    parser.add_argument("--force", action="store_true", help="Regenerate summaries that already exist")
+    parser.add_argument("--batch-size", type=int, default=META_BATCH_SIZE,
+                        help=f"Meta updates per WordPress request (default: {META_BATCH_SIZE})")
+    args = parser.parse_args()
+
     print("--- Batch Summarizer Started ---")
-    
+
     # Initialize Clients
     try:
-        gemini = GeminiClient()
+        gemini = get_client()
         wp = WordPressClient()
     except Exception as e:
         print(f"Failed to initialize clients: {e}")
         sys.exit(1)
-        
-    # Get all published posts
-    print("Fetching all posts from WordPress...")
-    posts = wp.get_posts(limit=100, status="publish") # Adjust limit as needed
-    print(f"Found {len(posts)} posts.")
-    
-    updated_count = 0
-    skipped_count = 0
-    
-    for post in posts:
-        post_id = post['id']
-        title = post['title']['rendered']
-        print(f"\nProcessing ID: {post_id} | Title: {title}")
-        
-        # Check if summary already exists
-        # Note: We need a method to get meta fields. 
-        # Since get_posts result usually doesn't include all meta unless specified,
-        # we might need to rely on the fact that if we use wp.get_post(id), we get meta.
-        # But for efficiency, we can just fetch meta or try to update blindly if we want to refresh.
-        # Here we will try to fetch the specific post details to be sure, or check if we can get meta from the list.
-        # Standard WP API 'posts' endpoint usually requires '?context=edit' to see meta, which requires auth.
-        # Our WP client uses Basic Auth so it should be possible.
-        
-        # Let's inspect the post object keys to see if meta is there
-        # If not, we fetch the single post with context=edit
-        
-        # Optimization: Just check if we should regenerate. 
-        # For now, let's assume we want to backfill missing ones.
-        
-        try:
-            # 1. Fetch full content and meta
-            # We need the pure content for summarization (rendered content is HTML)
-            content = post['content']['rendered']
-            
-            # Check for existing meta (we might need a dedicated call if not in list response)
-            # For simplicity in this script, we'll generate and update. 
-            # If you want to skip, we'd need to check the meta first.
-            # Let's try to fetch meta first.
-            
-            # For this MVP, we will RE-GENERATE for all targets to ensure quality, 
-            # unless a specific flag is set. 
-            # Or we can check if 'meta' is in the post object.
-            
-            meta = post.get('meta', {})
-            if 'ai_structured_summary' in meta and meta['ai_structured_summary']:
-                print("  - Summary already exists. Skipping.")
-                skipped_count += 1
-                continue
-            
-            # 2. Generate Summary
-            print("  - Generating structured summary...")
-            # Strip HTML from content for token efficiency
-            import re
-            text_content = re.sub('<[^<]+?>', '', content)
-            
-            summary_json = gemini.generate_structured_summary(text_content)
-            
-            if summary_json:
-                # 3. Update Post Meta
-                print("  - Updating WordPress post meta...")
-                
-                # Convert JSON dict to string for storage
-                meta_value = json.dumps(summary_json, ensure_ascii=False)
-                
-                # Update post
-                # We need a method in WP Client to update meta.
-                # Since create_post can update if ID is provided, or we can use a new method.
-                # Let's see if we can use create_post or if we need to add update_post.
-                # Actually, verify if wp.create_post supports updating by ID?
-                # Looking at wp_client.py (I can't see it now, but standard logic):
-                # Usually create_post makes a NEW post. 
-                # We should add an 'update_post_meta' or usage of 'posts/<id>' endpoint.
-                
-                # For now, we will assume we need to use the requests object directly from wp client 
-                # or add a method. Let's try to use a direct request here for flexibility.
-                
-                # Use api_url which corresponds to /wp/v2
-                url = f"{wp.api_url}/posts/{post_id}"
-                data = {
-                    "meta": {
-                        "ai_structured_summary": meta_value
-                    }
-                }
-                
-                # We need to manually add authentication since we are using requests directly via session if available, 
-                # or just requests.post with auth. The wp_client instance has .auth tuple.
-                import requests
-                response = requests.post(url, json=data, auth=wp.auth)
-                
-                if response.status_code == 200:
-                    print("  - Success: Meta updated.")
-                    updated_count += 1
-                else:
-                    print(f"  - Failed to update meta: {response.status_code} {response.text}")
-                    
-            else:
-                print("  - Failed to generate summary (Gemini returned None).")
-                
-            # Sleep to avoid rate limits
-            time.sleep(2)
-            
-        except Exception as e:
-            print(f"  - Error processing post {post_id}: {e}")
+
+    counts = run_backfill(gemini, wp, checkpoint_path=args.checkpoint, workers=args.workers,
+                          limit=args.limit, restart=args.restart, force=args.force,
+                          batch_size=args.batch_size)
 
     print(f"\n--- Batch Complete ---")
-    print(f"Updated: {updated_count}")
-    print(f"Skipped: {skipped_count}")
+    print(f"Updated: {counts['updated']}")
+    print(f"Skipped: {counts['skipped']}")
+    print(f"Failed: {counts['failed']}")
+    print(f"Checkpoint: {args.checkpoint}")
 
 if __name__ == "__main__":
     main()
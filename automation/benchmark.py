@@ -0,0 +1,741 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Harness for LogiShift
+
+Runs pipeline.main and generate_article_flow end to end without network access
+or API quota:
+- Fake Gemini (google-genai client stand-in) with configurable latency,
+  429 injection and canned responses
+- Local HTTP stub for the WordPress REST API, replayed RSS fixtures
+  (benchmark_fixtures/rss/*.xml) and article pages for url_reader
+
+Reports wall time, Gemini calls per stage (from tracing.py), WordPress requests
+per route and peak memory, so performance changes can be compared offline.
+
+Usage:
+    python automation/benchmark.py
+    python automation/benchmark.py --scenario article --articles 5 --latency 0.5
+    python automation/benchmark.py --rate-limit-rate 0.1 --json before.json
+    python automation/benchmark.py --scenario render --render-repeat 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from automation import collector, fixture_archive, gemini_client, markdown_renderer, pipeline, prefilter
+    from automation.gemini_client import estimate_tokens
+    from automation.generate_article import generate_article_flow
+    from automation.tracing import tracer
+    from automation.usage_ledger import ledger
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from automation import collector, fixture_archive, gemini_client, markdown_renderer, pipeline, prefilter
+    from automation.gemini_client import estimate_tokens
+    from automation.generate_article import generate_article_flow
+    from automation.tracing import tracer
+    from automation.usage_ledger import ledger
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BASE_DIR, "benchmark_fixtures")
+RSS_FIXTURE_DIR = os.path.join(FIXTURE_DIR, "rss")
+OUTPUT_DIR = os.path.join(BASE_DIR, "generated_articles")
+SCORED_FILE = os.path.join(BASE_DIR, "scored_articles.json")
+
+# CLI entry points timed by the import benchmark (`--scenario imports`), and the
+# heavy third-party packages that should only load when their code path runs
+ENTRY_POINTS = ["pipeline.py", "generate_article.py", "collector.py", "scorer.py", "url_reader.py",
+                "summarizer.py", "generate_weekly_summary.py", "generate_cluster_article.py",
+                "usage_ledger.py", "fixture_archive.py", "republish.py"]
+HEAVY_MODULES = ["google.genai", "feedparser", "bs4", "lxml", "markdown", "tweepy", "PIL"]
+
+# Posts the WordPress stub starts with (dedup pool and internal link candidates)
+SEED_POST_COUNT = 30
+
+ARTICLE_KEYWORDS = [
+    ("WMS 導入 メリット", "know"),
+    ("AMR 比較", "buy"),
+    ("倉庫 誤出荷 削減", "do"),
+    ("物流 2024年問題 最新動向", "news"),
+    ("Warehouse robotics in the US", "global"),
+]
+
+
+def _make_image(width=1408, height=768):
+    """A noisy gradient roughly as hard to compress as a real Gemini hero image."""
+    from PIL import Image
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 48)
+    return Image.merge("RGB", (gradient, noise, gradient.rotate(180)))
+
+
+def _encode_png(image, serial):
+    """PNG bytes with a per-call pixel change, so uploads never hit the media cache."""
+    image = image.copy()
+    image.putpixel((0, 0), (serial % 256, serial // 256 % 256, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+# --- Fake Gemini -------------------------------------------------------------
+
+class FakeResponse:
+    def __init__(self, text="", prompt="", image_bytes=None):
+        self.text = text
+        self.parts = []
+        self.generated_images = []
+        if image_bytes is not None:
+            self.parts = [SimpleNamespace(inline_data=SimpleNamespace(data=image_bytes, mime_type="image/png"), text=None)]
+            self.generated_images = [SimpleNamespace(image=SimpleNamespace(image_bytes=image_bytes))]
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=estimate_tokens(prompt),
+            candidates_token_count=estimate_tokens(text) if text else 1290,
+            thoughts_token_count=0,
+        )
+
+
+class FakeGemini:
+    """
+    Stand-in for genai.Client().models. Responses are chosen by prompt markers;
+    `canned` ({marker: response text}) takes precedence over the built-in handlers.
+    """
+
+    def __init__(self, latency=0.05, output_tps=0, rate_limit_rate=0.0, canned=None, seed=0):
+        self.latency = latency
+        self.output_tps = output_tps
+        self.rate_limit_rate = rate_limit_rate
+        self.canned = canned or {}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.rate_limited = 0
+        self.images = 0
+        self._image = None
+
+    def reset(self):
+        with self.lock:
+            self.calls = {}
+            self.rate_limited = 0
+
+    # google-genai surface used by GeminiClient: genai.Client(...).models.generate_content(_stream) / generate_images
+    def client(self, *args, **kwargs):
+        return SimpleNamespace(models=SimpleNamespace(generate_content=self.generate_content,
+                                                      generate_content_stream=self.generate_content_stream,
+                                                      generate_images=self.generate_images))
+
+    def _begin(self, model):
+        with self.lock:
+            self.calls[model] = self.calls.get(model, 0) + 1
+            limited = self.rng.random() < self.rate_limit_rate
+            if limited:
+                self.rate_limited += 1
+        if limited:
+            time.sleep(self.latency / 4)
+            raise Exception("429 RESOURCE_EXHAUSTED: quota exceeded (injected by benchmark)")
+
+    def _respond(self, prompt, text=None, image=False):
+        start = time.perf_counter()
+        if image:
+            with self.lock:
+                if self._image is None:
+                    self._image = _make_image()
+                self.images += 1
+                serial = self.images
+            response = FakeResponse(prompt=prompt, image_bytes=_encode_png(self._image, serial))
+        else:
+            response = FakeResponse(text=text, prompt=prompt)
+        # Building the response counts towards the simulated latency
+        delay = self.latency
+        if self.output_tps:
+            delay += response.usage_metadata.candidates_token_count / self.output_tps
+        time.sleep(max(0.0, delay - (time.perf_counter() - start)))
+        return response
+
+    def _text_for(self, prompt):
+        for marker, text in self.canned.items():
+            if marker in prompt:
+                return text
+        return self._builtin(prompt)
+
+    def generate_content(self, model=None, contents=None, config=None, **kwargs):
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str, ensure_ascii=False)
+        self._begin(model)
+        if model and "image" in model:
+            return self._respond(prompt, image=True)
+        return self._respond(prompt, self._text_for(prompt))
+
+    def generate_content_stream(self, model=None, contents=None, config=None, **kwargs):
+        """Yield the response in ~20 chunks spread over the simulated latency (usage on the last chunk)."""
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str, ensure_ascii=False)
+        self._begin(model)
+        response = FakeResponse(text=self._text_for(prompt), prompt=prompt)
+        total = self.latency
+        if self.output_tps:
+            total += response.usage_metadata.candidates_token_count / self.output_tps
+        size = max(1, len(response.text) // 20)
+        pieces = [response.text[i:i + size] for i in range(0, len(response.text), size)] or [""]
+        for i, piece in enumerate(pieces):
+            time.sleep(total / len(pieces))
+            last = i == len(pieces) - 1
+            yield SimpleNamespace(text=piece, usage_metadata=response.usage_metadata if last else None)
+
+    def generate_images(self, model=None, prompt=None, config=None, **kwargs):
+        self._begin(model)
+        return self._respond(prompt or "", image=True)
+
+    def _builtin(self, prompt):
+        if "【記事リスト】" in prompt:
+            # Batch scoring: deterministic score per title so runs are comparable
+            results = []
+            for local_id, title in re.findall(r"^ID: (\d+)\nタイトル: (.*)$", prompt, re.M):
+                score = 50 + zlib.crc32(title.encode("utf-8")) % 50
+                results.append({"id": int(local_id), "score": score, "reasoning": "ベンチマーク用の固定スコア。",
+                                "relevance": "high" if score >= 80 else "medium"})
+            return json.dumps(results, ensure_ascii=False)
+        if "duplicate content detector" in prompt:
+            return json.dumps({"is_duplicate": False, "duplicate_of": None, "reason": "benchmark"})
+        if '"category": "slug"' in prompt:
+            # classify() and classify_article() share the taxonomy output format
+            return json.dumps({"article_type": "news", "category": "logistics-dx",
+                               "industry_tags": ["3pl-warehouse"], "theme_tags": ["automation-robot"],
+                               "region_tags": ["japan"]})
+        if "【元記事】" in prompt:
+            return json.dumps({"summary": "物流センターの自動化投資に関するニュース。" * 10,
+                               "key_facts": ["AMRを200台導入", "生産性2倍", "WMSと連携"],
+                               "logishift_angle": "中小倉庫でも段階導入で効果が見込める。"}, ensure_ascii=False)
+        if "You are an SEO expert" in prompt:
+            ids = re.findall(r"- ID: (\d+) \|", prompt)[:3]
+            return json.dumps([{"id": int(i), "title": "", "score": 90, "reason": "benchmark"} for i in ids])
+        if "メタディスクリプション" in prompt:
+            return ("物流現場の課題を解決する最新の自動化事例を紹介。導入の手順、費用対効果、注意点を物流担当者向けに"
+                    "わかりやすく解説します。自社の倉庫運営を見直すヒントが見つかります。人手不足対策やコスト削減に"
+                    "取り組む担当者必見の内容です。")
+        if "image generation prompts" in prompt:
+            return "Modern automated warehouse with autonomous mobile robots moving between tall racks, photorealistic, 4k"
+        if "structured summary" in prompt:
+            return json.dumps({"summary": "倉庫自動化の導入手順と効果を解説した記事。" * 8,
+                               "key_topics": ["AMR", "WMS", "ピッキング"], "entities": ["LogiShift"]}, ensure_ascii=False)
+        if "social media manager" in prompt:
+            return json.dumps({"hook": "🚚 倉庫の自動化、まだ先の話だと思っていませんか？",
+                               "summary": "導入済み企業は生産性2倍。今から始める3つのステップを解説。",
+                               "url_text": "詳細はこちら", "hashtags": ["#物流DX", "#AMR"]}, ensure_ascii=False)
+        keyword = re.search(r"^\s*キーワード: (.+)$", prompt, re.M)
+        if keyword:
+            return _fake_article(keyword.group(1).strip())
+        return "OK"
+
+
+def _fake_article(keyword):
+    sections = []
+    for i in range(1, 6):
+        body = f"{keyword}に関する解説です。物流現場での活用方法や導入時の注意点を具体的に紹介します。" * 6
+        sections.append(f"## {keyword}のポイント{i}\n\n{body}\n\n### 具体例{i}\n\n- 項目A\n- 項目B\n\n| 指標 | 値 |\n|---|---|\n| 効率 | {i * 10}% |")
+    return f"# {keyword}とは？物流担当者向けに徹底解説\n\n" + "\n\n".join(sections)
+
+
+# --- Local HTTP stub (WordPress REST API, RSS fixtures, article pages) ---------
+
+class StubState:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.media_bytes = 0
+        self.posts = []
+        self.tags = {}
+        self.next_id = 1000
+        for i in range(1, SEED_POST_COUNT + 1):
+            summary = {"summary": f"既存記事{i}の要約。倉庫管理と配送の効率化について。", "key_topics": ["WMS", "配送"]}
+            self.posts.append({
+                "id": i,
+                "title": {"rendered": f"既存記事{i}: 物流DXの取り組み事例"},
+                "excerpt": {"rendered": f"<p>既存記事{i}の抜粋です。</p>"},
+                "link": f"/?p={i}",
+                "meta": {"ai_structured_summary": json.dumps(summary, ensure_ascii=False)},
+            })
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = {}
+            self.media_bytes = 0
+
+    def count(self, method, route):
+        with self.lock:
+            key = f"{method} {route}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def new_id(self):
+        with self.lock:
+            self.next_id += 1
+            return self.next_id
+
+
+def _replay_feed(xml):
+    """Shift pubDates so the newest item is 10 minutes old (fixtures stay inside any lookback window)."""
+    dates = [parsedate_to_datetime(d) for d in re.findall(r"<pubDate>(.*?)</pubDate>", xml)]
+    if not dates:
+        return xml
+    shift = datetime.now(dates[0].tzinfo) - timedelta(minutes=10) - max(dates)
+    return re.sub(r"<pubDate>(.*?)</pubDate>",
+                  lambda m: f"<pubDate>{format_datetime(parsedate_to_datetime(m.group(1)) + shift)}</pubDate>", xml)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None  # set by start_stub_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        return parsed.path, query.pop("rest_route", None), query
+
+    def do_GET(self):
+        path, rest_route, query = self._route()
+        state = self.state
+        if rest_route:
+            time.sleep(state.latency)
+            route = re.sub(r"/\d+$", "/<id>", rest_route)
+            state.count("GET", route)
+            if rest_route == "/wp/v2/posts":
+                limit = int(query.get("per_page", 10))
+                return self._send(200, list(reversed(state.posts))[:limit])
+            if rest_route == "/logishift/v1/popular-posts":
+                return self._send(200, state.posts[:int(query.get("limit", 20))])
+            if rest_route == "/wp/v2/categories":
+                return self._send(200, [{"id": zlib.crc32(query.get("slug", "").encode()) % 100 + 1}])
+            if rest_route == "/wp/v2/tags":
+                tag_id = state.tags.get(query.get("slug"))
+                return self._send(200, [{"id": tag_id}] if tag_id else [])
+            return self._send(404, {"code": "rest_no_route"})
+
+        base_url = f"http://{self.headers.get('Host')}"
+        if path.startswith("/feeds/"):
+            state.count("GET", "/feeds/<source>")
+            fixture = os.path.join(RSS_FIXTURE_DIR, os.path.basename(path))
+            if not os.path.exists(fixture):
+                return self._send(404, "not found", "text/plain")
+            with open(fixture, "r", encoding="utf-8") as f:
+                xml = f.read().replace("{base_url}", base_url)
+            return self._send(200, _replay_feed(xml), "application/rss+xml; charset=utf-8")
+        if path.startswith("/articles/"):
+            state.count("GET", "/articles/<page>")
+            return self._send(200, _article_page(path), "text/html; charset=utf-8")
+        return self._send(404, "not found", "text/plain")
+
+    def do_POST(self):
+        path, rest_route, query = self._route()
+        state = self.state
+        body = self._read_body()
+        time.sleep(state.latency)
+        route = re.sub(r"/\d+$", "/<id>", rest_route or path)
+        state.count("POST", route)
+        if rest_route == "/wp/v2/media":
+            new_id = state.new_id()
+            with state.lock:
+                state.media_bytes += len(body)
+            return self._send(201, {"id": new_id, "source_url": f"/wp-content/uploads/{new_id}.webp"})
+        if rest_route == "/wp/v2/tags":
+            data = json.loads(body or b"{}")
+            tag_id = state.new_id()
+            state.tags[data.get("slug")] = tag_id
+            return self._send(201, {"id": tag_id})
+        if rest_route == "/wp/v2/posts":
+            data = json.loads(body or b"{}")
+            new_id = state.new_id()
+            post = {"id": new_id, "title": {"rendered": data.get("title", "")},
+                    "excerpt": {"rendered": data.get("excerpt") or ""}, "link": f"/?p={new_id}",
+                    "meta": data.get("meta") or {}}
+            with state.lock:
+                state.posts.append(post)
+            return self._send(201, post)
+        if rest_route and re.match(r"/wp/v2/posts/\d+$", rest_route):
+            return self._send(200, {"id": int(rest_route.rsplit("/", 1)[1])})
+        return self._send(404, {"code": "rest_no_route"})
+
+
+def _article_page(path):
+    """Article HTML matching the url_reader selectors of every configured source."""
+    paragraphs = "".join(f"<p>段落{i}: {path} に関する本文です。物流センターの自動化と人手不足対策について詳しく報じています。</p>"
+                         for i in range(1, 31))
+    return (f"<html><head><title>{path}</title></head><body>"
+            f"<h1 class=\"entry-title article-title wsj-article-headline\">Benchmark article {path}</h1>"
+            f"<span class=\"author author-name\">LogiShift Bench</span>"
+            f"<div class=\"entry-content article-body article-content prose editorial-content__body\">{paragraphs}"
+            f"<script>var tracking = 1;</script></div></body></html>")
+
+
+def start_stub_server(state):
+    StubHandler.state = state
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Harness -------------------------------------------------------------------
+
+class Sandbox:
+    """Redirects every file the pipeline writes and removes benchmark output afterwards."""
+
+    def __init__(self, base_url, fake, keep_output=False, archive=None):
+        self.base_url = base_url
+        self.fake = fake
+        self.keep_output = keep_output
+        self.archive = archive
+        self.tmp = tempfile.mkdtemp(prefix="logishift_bench_")
+
+    def __enter__(self):
+        self.outputs_before = set(os.listdir(OUTPUT_DIR)) if os.path.isdir(OUTPUT_DIR) else set()
+        self.scored_backup = None
+        if os.path.exists(SCORED_FILE):
+            with open(SCORED_FILE, "rb") as f:
+                self.scored_backup = f.read()
+
+        # Environment is applied after the modules are imported (gemini_client loads .env with override=True)
+        self.saved_env = dict(os.environ)
+        for key in ("GOOGLE_CLOUD_PROJECT", "GOOGLE_CLOUD_LOCATION"):
+            os.environ.pop(key, None)
+        os.environ.update({
+            "GEMINI_API_KEY": "benchmark",
+            "WP_URL": self.base_url, "WP_USER": "bench", "WP_APP_PASSWORD": "bench",
+            "WP_MEDIA_CACHE": os.path.join(self.tmp, "media_cache.json"),
+            "X_API_KEY": "", "THREADS_USER_ID": "", "THREADS_ACCESS_TOKEN": "",
+        })
+
+        self.saved = {
+            "genai": gemini_client.genai,
+            "sources": collector.DEFAULT_SOURCES,
+            "append_history": prefilter.append_history,
+            "ledger": (ledger.path, ledger.daily_budget, ledger._today),
+        }
+        gemini_client.genai = SimpleNamespace(Client=self.fake.client)
+        # Load the lazily imported SDKs up front so scenario timings exclude one-off
+        # import cost (measured by the imports scenario instead)
+        gemini_client._load_sdk()
+        import bs4, feedparser, markdown  # noqa: F401
+        # Shared clients must be rebuilt against the fake SDK
+        gemini_client.reset_client()
+        if self.archive:
+            # Replay recorded feeds and pages (fixture_archive.py) instead of the stub's synthetic ones
+            archive = fixture_archive.configure(fixture_archive.MODE_REPLAY, self.archive)
+            collector.DEFAULT_SOURCES = {e["source"]: e["url"] for e in archive.entries(fixture_archive.KIND_RSS)}
+        else:
+            collector.DEFAULT_SOURCES = {
+                os.path.splitext(name)[0]: f"{self.base_url}/feeds/{name}"
+                for name in sorted(os.listdir(RSS_FIXTURE_DIR)) if name.endswith(".xml")
+            }
+        history_path = os.path.join(self.tmp, "scoring_history.jsonl")
+        prefilter.append_history = lambda scored, path=history_path: self.saved["append_history"](scored, path)
+        ledger.path, ledger.daily_budget, ledger._today = os.path.join(self.tmp, "usage_ledger.jsonl"), None, None
+        trace_dir = os.path.join(self.tmp, "traces")
+        tracer.start_run = lambda trace_dir=trace_dir, run_id=None: type(tracer).start_run(tracer, trace_dir, run_id)
+        return self
+
+    def __exit__(self, *exc):
+        os.environ.clear()
+        os.environ.update(self.saved_env)
+        gemini_client.genai = self.saved["genai"]
+        gemini_client.reset_client()
+        collector.DEFAULT_SOURCES = self.saved["sources"]
+        prefilter.append_history = self.saved["append_history"]
+        ledger.path, ledger.daily_budget, ledger._today = self.saved["ledger"]
+        del tracer.start_run
+        if self.archive:
+            fixture_archive.configure()
+
+        if not self.keep_output:
+            if os.path.isdir(OUTPUT_DIR):
+                for name in set(os.listdir(OUTPUT_DIR)) - self.outputs_before:
+                    os.remove(os.path.join(OUTPUT_DIR, name))
+            if self.scored_backup is not None:
+                with open(SCORED_FILE, "wb") as f:
+                    f.write(self.scored_backup)
+            elif os.path.exists(SCORED_FILE):
+                os.remove(SCORED_FILE)
+            shutil.rmtree(self.tmp, ignore_errors=True)
+        else:
+            print(f"Benchmark output kept in {OUTPUT_DIR} and {self.tmp}")
+        return False
+
+
+def measure(name, func, fake, state, verbose=False):
+    """Run one scenario and collect wall time, per-stage calls, WP requests and peak memory."""
+    tracer.reset()
+    fake.reset()
+    state.reset_counters()
+    tracemalloc.start()
+    start = time.perf_counter()
+    error = None
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with sink:
+            func()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "wall_s": round(wall, 3),
+        "error": error,
+        "gemini_calls": dict(sorted(fake.calls.items())),
+        "rate_limited": fake.rate_limited,
+        "stages": tracer.summary(),
+        "wp_requests": dict(sorted(state.requests.items())),
+        "media_bytes": state.media_bytes,
+        "peak_traced_mb": round(peak / 1024 / 1024, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_pipeline(args):
+    argv = ["pipeline.py", "--hours", "24", "--limit", str(args.limit), "--threshold", str(args.threshold)]
+    if args.dry_run:
+        argv.append("--dry-run")
+    saved_argv = sys.argv
+    sys.argv = argv
+    try:
+        pipeline.main()
+    finally:
+        sys.argv = saved_argv
+
+
+def run_articles(args):
+    gemini = gemini_client.get_client()
+    try:
+        from automation.wp_client import WordPressClient
+    except ImportError:
+        from wp_client import WordPressClient
+    wp = WordPressClient()
+    context = json.dumps({"summary": "物流センターの自動化投資が加速している。", "key_facts": ["AMR200台", "生産性2倍"]},
+                         ensure_ascii=False)
+    for i in range(args.articles):
+        keyword, article_type = ARTICLE_KEYWORDS[i % len(ARTICLE_KEYWORDS)]
+        generate_article_flow(
+            keyword=f"{keyword} {i + 1}" if i >= len(ARTICLE_KEYWORDS) else keyword,
+            article_type=article_type,
+            dry_run=args.dry_run,
+            context=context if article_type in ("news", "global") else None,
+            gemini_client=gemini,
+            wp_client=wp,
+            stream=not args.no_stream,
+        )
+
+
+def run_import_benchmark(repeat=3):
+    """Median `<script> --help` wall time per entry point, plus the heavy packages it imports."""
+    rows = []
+    for script in ENTRY_POINTS:
+        command = [sys.executable, os.path.join(BASE_DIR, script), "--help"]
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            proc = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(BASE_DIR))
+            timings.append(time.perf_counter() - start)
+        # One extra run with -X importtime to see which heavy packages were loaded
+        trace = subprocess.run([sys.executable, "-X", "importtime"] + command[1:], capture_output=True, text=True,
+                               cwd=os.path.dirname(BASE_DIR)).stderr
+        loaded = set(re.findall(r"^import time:.*\|\s+(\S+)$", trace, re.M))
+        rows.append({
+            "script": script,
+            "startup_s": round(statistics.median(timings), 3),
+            "ok": proc.returncode == 0,
+            "heavy_imports": [m for m in HEAVY_MODULES if m in loaded],
+        })
+    return rows
+
+
+def print_import_report(rows):
+    print("\n=== Benchmark: CLI startup (--help) ===")
+    print(f"{'Entry point':<30}{'Startup(s)':>11}  Heavy imports")
+    for r in rows:
+        status = "" if r["ok"] else "  (exit != 0)"
+        print(f"{r['script']:<30}{r['startup_s']:>11.2f}  {', '.join(r['heavy_imports']) or '-'}{status}")
+
+
+def run_render_benchmark(repeat=10):
+    """
+    Re-render every Markdown file in generated_articles/ with the previous per-call
+    setup (two cleanup regex passes + markdown.markdown) and with markdown_renderer,
+    and check both produce identical HTML.
+    """
+    import markdown
+    docs = []
+    for name in sorted(os.listdir(OUTPUT_DIR)) if os.path.isdir(OUTPUT_DIR) else []:
+        if name.endswith(".md"):
+            with open(os.path.join(OUTPUT_DIR, name), "r", encoding="utf-8") as f:
+                docs.append(markdown_renderer.split_frontmatter(f.read())[1])
+
+    def legacy(text):
+        text = re.sub(r'<br\s*/?>\s*', ' ', text)
+        text = re.sub(r'<([^>]+)>', '', text)
+        return markdown.markdown(text, extensions=['extra', 'nl2br', 'tables'])
+
+    def shared(text):
+        return markdown_renderer.render_html(markdown_renderer.clean_markdown(text), "article")
+
+    timings = {}
+    outputs = {}
+    for name, render in (("markdown.markdown", legacy), ("markdown_renderer", shared)):
+        render(docs[0] if docs else "")  # warm up (extension imports)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs[name] = [render(doc) for doc in docs]
+        timings[name] = time.perf_counter() - start
+    mismatches = sum(a != b for a, b in zip(outputs["markdown.markdown"], outputs["markdown_renderer"]))
+    return {
+        "documents": len(docs),
+        "chars": sum(len(doc) for doc in docs),
+        "repeat": repeat,
+        "seconds": {name: round(t, 3) for name, t in timings.items()},
+        "mismatches": mismatches,
+    }
+
+
+def print_render_report(result):
+    print(f"\n=== Benchmark: render generated_articles/ ({result['documents']} docs, "
+          f"{result['chars'] // 1000}k chars, x{result['repeat']}) ===")
+    renders = result["documents"] * result["repeat"]
+    for name, seconds in result["seconds"].items():
+        per_doc = seconds / renders * 1000 if renders else 0
+        print(f"{name:<20}{seconds:>8.2f}s  {per_doc:>6.2f} ms/doc")
+    print(f"Identical HTML:      {result['documents'] - result['mismatches']}/{result['documents']}")
+
+
+def print_report(result):
+    print(f"\n=== Benchmark: {result['scenario']} ===")
+    if result["error"]:
+        print(f"ERROR: {result['error']}")
+    print(f"Wall time:        {result['wall_s']:.2f}s")
+    print(f"Peak memory:      {result['peak_traced_mb']:.1f} MB traced (max RSS {result['max_rss_mb']:.0f} MB)")
+    calls = sum(result["gemini_calls"].values())
+    print(f"Gemini calls:     {calls} ({result['rate_limited']} rate-limited) "
+          + ", ".join(f"{m}={n}" for m, n in result["gemini_calls"].items()))
+    print(f"WP requests:      {sum(result['wp_requests'].values())} ({result['media_bytes'] // 1024} KB media uploaded)")
+    for route, n in result["wp_requests"].items():
+        print(f"  {route:<40}{n:>5}")
+    print(f"{'Stage':<24}{'Count':>6}{'Time(s)':>10}{'Calls':>7}{'In tok':>10}{'Out tok':>10}{'Retry':>7}")
+    for r in result["stages"]:
+        print(f"{r['stage'][:23]:<24}{r['count']:>6}{r['duration_s']:>10.2f}{r['gemini_calls']:>7}"
+              f"{r['input_tokens']:>10}{r['output_tokens']:>10}{r['retries']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the LogiShift pipeline (fake Gemini + stub WordPress).")
+    parser.add_argument("--scenario", choices=["pipeline", "article", "imports", "render", "all"], default="all",
+                        help="What to run (default: all)")
+    parser.add_argument("--articles", type=int, default=3, help="Articles for the generate_article_flow scenario (default: 3)")
+    parser.add_argument("--limit", type=int, default=2, help="pipeline --limit (default: 2)")
+    parser.add_argument("--threshold", type=int, default=85, help="pipeline --threshold (default: 85)")
+    parser.add_argument("--dry-run", action="store_true", help="Skip WordPress posting")
+    parser.add_argument("--no-stream", action="store_true", help="Disable streamed article generation")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake Gemini latency per call in seconds (default: 0.05)")
+    parser.add_argument("--output-tps", type=float, default=0, help="Fake Gemini output tokens/sec added to latency (0 = off)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of Gemini calls failing with 429 (0-1)")
+    parser.add_argument("--wp-latency", type=float, default=0.0, help="Stub WordPress latency per request in seconds")
+    parser.add_argument("--archive", type=str, help="Replay feeds/pages from a recorded fixture archive (fixture_archive.py)")
+    parser.add_argument("--canned", type=str, help="JSON file {prompt marker: response text} overriding built-in responses")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (source order, 429 injection)")
+    parser.add_argument("--json", type=str, help="Write the report to this JSON file")
+    parser.add_argument("--keep-output", action="store_true", help="Keep generated files instead of cleaning up")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    parser.add_argument("--import-repeat", type=int, default=3, help="Runs per entry point for the imports scenario (default: 3)")
+    parser.add_argument("--render-repeat", type=int, default=10, help="Passes over generated_articles/ for the render scenario (default: 10)")
+    args = parser.parse_args()
+
+    import_rows = []
+    if args.scenario in ("imports", "all"):
+        import_rows = run_import_benchmark(repeat=args.import_repeat)
+        print_import_report(import_rows)
+    render_result = None
+    if args.scenario in ("render", "all"):
+        render_result = run_render_benchmark(repeat=args.render_repeat)
+        print_render_report(render_result)
+    if args.scenario in ("imports", "render"):
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "created_at": datetime.now().isoformat(timespec="seconds"),
+                           "imports": import_rows, "render": render_result}, f, indent=2, ensure_ascii=False)
+            print(f"\nReport saved to: {args.json}")
+        return
+
+    canned = None
+    if args.canned:
+        with open(args.canned, "r", encoding="utf-8") as f:
+            canned = json.load(f)
+
+    random.seed(args.seed)
+    fake = FakeGemini(latency=args.latency, output_tps=args.output_tps, rate_limit_rate=args.rate_limit_rate,
+                      canned=canned, seed=args.seed)
+    state = StubState(latency=args.wp_latency)
+    server, base_url = start_stub_server(state)
+    print(f"Stub server: {base_url} | fake Gemini latency {args.latency}s, 429 rate {args.rate_limit_rate}")
+
+    scenarios = []
+    if args.scenario in ("pipeline", "all"):
+        scenarios.append(("pipeline", lambda: run_pipeline(args)))
+    if args.scenario in ("article", "all"):
+        scenarios.append((f"generate_article_flow x{args.articles}", lambda: run_articles(args)))
+
+    results = []
+    try:
+        with Sandbox(base_url, fake, keep_output=args.keep_output, archive=args.archive):
+            for name, func in scenarios:
+                result = measure(name, func, fake, state, verbose=args.verbose)
+                print_report(result)
+                results.append(result)
+    finally:
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "created_at": datetime.now().isoformat(timespec="seconds"),
+                       "results": results, "imports": import_rows, "render": render_result}, f, indent=2, ensure_ascii=False)
+        print(f"\nReport saved to: {args.json}")
+
+    if any(r["error"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,34 @@
+import hashlib
 import json
 import re
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client
+    from automation.prompt_templates import register
 except ImportError:
-    from gemini_client import GeminiClient
+    from gemini_client import get_client
+    from prompt_templates import register
 
-class ArticleClassifier:
-    def __init__(self, client=None):
-        self.gemini = client if client else GeminiClient()
-        
-    def classify_article(self, title, content_summary):
-        """
-        Classify an article into Category, Industry Tags, and Theme Tags.
-        
-        Returns:
-            dict: {
-                "category": "slug",
-                "industry_tags": ["slug1", "slug2"],
-                "theme_tags": ["slug1", "slug2"]
-            }
-        """
-        
-        prompt = f"""
-        あなたは物流メディア「LogiShift」の編集者です。
-        以下の記事タイトルと概要を分析し、最も適切な「カテゴリ（1つ）」と「タグ（複数可）」を選択してください。
-        
-        ## 記事情報
-        タイトル: {title}
-        概要: {content_summary}
-        
+# Sources that are always overseas news
+GLOBAL_SOURCES = ["techcrunch", "wsj_logistics", "supply_chain_dive", "freightwaves", "36kr_japan", "pandaily"]
+
+# Keyword rules for the local type classifier (title hits count double)
+TYPE_KEYWORDS = {
+    "buy": ["比較", "おすすめ", "オススメ", "選び方", "選定", "ランキング", "価格", "料金", "費用相場"],
+    "do": ["事例", "導入", "成功", "実践", "ノウハウ", "手順", "改善", "削減した", "取り組み"],
+    "know": ["とは", "仕組み", "基礎", "入門", "メリット", "デメリット", "違い", "用語", "徹底解説"],
+    "news": ["発表", "開始", "開設", "稼働", "提携", "買収", "出資", "決算", "人事", "速報", "国交省", "国土交通省", "経産省", "閣議"],
+    "global": ["海外", "米国", "アメリカ", "中国", "欧州", "ヨーロッパ", "ドイツ", "英国", "インド", "東南アジア", "シンガポール"],
+}
+TYPE_PATTERNS = {
+    "buy": [re.compile(r"\d+選")],
+    "news": [re.compile(r"\d{1,2}月\d{1,2}日")],
+}
+JAPANESE_CHARS = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]")
+
+VALID_TYPES = ["know", "buy", "do", "news", "global"]
+
+# Category / tag choices shared by classify_article and classify
+TAXONOMY_SECTIONS = """
         ## 1. カテゴリ (必ず1つ選択)
         - 物流DX・トレンド (logistics-dx)
         - 倉庫管理・WMS (warehouse-management)
@@ -61,7 +61,25 @@ class ArticleClassifier:
         - ヨーロッパ (europe)
         - 中国 (china)
         - 東南アジア (southeast-asia)
+"""
+
+DEFAULT_CLASSIFICATION = {
+    "category": "logistics-dx",
+    "industry_tags": [],
+    "theme_tags": [],
+    "region_tags": []
+}
+
+# Prompt templates (compiled once, see prompt_templates.py)
+CLASSIFY_ARTICLE_TEMPLATE = register("classify_article", """
+        あなたは物流メディア「LogiShift」の編集者です。
+        以下の記事タイトルと概要を分析し、最も適切な「カテゴリ（1つ）」と「タグ（複数可）」を選択してください。
+        
+        ## 記事情報
+        タイトル: {title}
+        概要: {content_summary}
         
+        """ + TAXONOMY_SECTIONS + """
         ## 出力フォーマット (JSONのみ)
         {{
             "category": "slug",
@@ -69,11 +87,85 @@ class ArticleClassifier:
             "theme_tags": ["slug1", "slug2"],
             "region_tags": ["slug1"]
         }}
+        """)
+
+CLASSIFY_TYPE_TEMPLATE = register("classify_type", """
+        あなたは物流メディアの編集長です。
+        以下の記事企画を、読者にとって最も価値のある5つの記事タイプ（フォーマット）のいずれかに分類してください。
+
+        記事タイトル: {title}
+        記事概要: {summary}
+
+        ## 選択肢 (以下のいずれか1つを選んでください)
+        1. know  (解説記事: 「WMSとは」「物流DXの仕組み」など、基礎知識や定義を解説)
+        2. buy   (比較記事: 「WMS比較」「おすすめ10選」「選び方」など、製品選定を支援)
+        3. do    (実践/事例: 「導入事例」「成功ノウハウ」「誤出荷ゼロへの道」など、具体的なハウツー)
+        4. news  (国内ニュース: 最新の行政動向、企業のプレスリリース、人事情報など速報値・時事性があるもの)
+        5. global (海外情報: 海外のトレンド、海外企業の事例、日本未上陸の技術)
+
+        ## 判定ルール
+        - 海外の国名や海外企業の話であれば「global」
+        - 「比較」「選定」「おすすめ」なら「buy」
+        - 「事例」「成功」「実践」なら「do」
+        - 「とは」「仕組み」「メリット」などの基礎解説なら「know」
+        - 特定の日付や「速報」などの時事性が強ければ「news」
+        
+        出力はタイプ名（know, buy, do, news, global）のみを小文字で返してください。
+        """)
+
+CLASSIFY_COMBINED_TEMPLATE = register("classify_combined", """
+        あなたは物流メディア「LogiShift」の編集長です。
+        以下の記事企画を分析し、「記事タイプ（1つ）」「カテゴリ（1つ）」「タグ（複数可）」を選択してください。
+
+        ## 記事情報
+        タイトル: {title}
+        概要: {summary}
+
+        ## 0. 記事タイプ (必ず1つ選択)
+        - know  (解説記事: 「WMSとは」「物流DXの仕組み」など、基礎知識や定義を解説)
+        - buy   (比較記事: 「WMS比較」「おすすめ10選」「選び方」など、製品選定を支援)
+        - do    (実践/事例: 「導入事例」「成功ノウハウ」「誤出荷ゼロへの道」など、具体的なハウツー)
+        - news  (国内ニュース: 最新の行政動向、企業のプレスリリース、人事情報など速報値・時事性があるもの)
+        - global (海外情報: 海外のトレンド、海外企業の事例、日本未上陸の技術)
+        ※ 海外の国名や海外企業の話であれば「global」
+        """ + TAXONOMY_SECTIONS + """
+        ## 出力フォーマット (JSONのみ)
+        {{
+            "article_type": "know|buy|do|news|global",
+            "category": "slug",
+            "industry_tags": ["slug1"],
+            "theme_tags": ["slug1", "slug2"],
+            "region_tags": ["slug1"]
+        }}
+        """)
+
+class ArticleClassifier:
+    # Local decisions at or above this confidence skip the Gemini call
+    RULE_CONFIDENCE_THRESHOLD = 0.75
+
+    def __init__(self, client=None):
+        self.gemini = client if client else get_client()
+        # Combined classification results keyed by article (see classify)
+        self._cache = {}
+        
+    def classify_article(self, title, content_summary):
         """
+        Classify an article into Category, Industry Tags, and Theme Tags.
+        
+        Returns:
+            dict: {
+                "category": "slug",
+                "industry_tags": ["slug1", "slug2"],
+                "theme_tags": ["slug1", "slug2"]
+            }
+        """
+        
+        prompt = CLASSIFY_ARTICLE_TEMPLATE.render(title=title, content_summary=content_summary)
         
         try:
-            response = self.gemini.client.models.generate_content(
-                model='gemini-3-flash-preview',
+            response = self.gemini._routed_request(
+                "classification",
+                self.gemini.client.models.generate_content,
                 contents=prompt,
                 config={
                     'response_mime_type': 'application/json'
@@ -87,14 +179,49 @@ class ArticleClassifier:
         except Exception as e:
             print(f"Classification failed: {e}")
             # Default fallback
-            return {
-                "category": "logistics-dx",
-                "industry_tags": [],
-                "theme_tags": [],
-                "region_tags": []
-            }
+            return {k: (list(v) if isinstance(v, list) else v) for k, v in DEFAULT_CLASSIFICATION.items()}
 
             
+    def _rule_based_type(self, title, summary, source=""):
+        """
+        Classify the article type locally from source, language and keywords.
+
+        Returns:
+            tuple: (type or None, confidence 0-1, reason)
+        """
+        if source in GLOBAL_SOURCES:
+            return "global", 1.0, f"source={source}"
+
+        # English-only titles come from overseas feeds / alerts
+        if title and not JAPANESE_CHARS.search(title):
+            return "global", 0.9, "non-Japanese title"
+
+        scores = {}
+        for article_type, keywords in TYPE_KEYWORDS.items():
+            score = 0
+            for kw in keywords:
+                if kw in title:
+                    score += 2
+                elif kw in summary:
+                    score += 1
+            for pattern in TYPE_PATTERNS.get(article_type, []):
+                if pattern.search(title):
+                    score += 2
+                elif pattern.search(summary):
+                    score += 1
+            if score:
+                scores[article_type] = score
+
+        if not scores:
+            return None, 0.0, "no keyword match"
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        top_type, top_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        # Margin-based confidence: one title hit alone gives 0.67, two uncontested hits 0.8
+        confidence = top_score / (top_score + runner_up + 1)
+        return top_type, confidence, f"keywords {scores}"
+
     def classify_type(self, title, summary, source=""):
         """
         Classify the article type based on title and summary.
@@ -108,38 +235,22 @@ class ArticleClassifier:
             str: One of [know, buy, do, news, global]
         """
         
-        # 1. Check for Global/News based on source/content first (Low cost)
-        if source in ["techcrunch", "wsj_logistics", "supply_chain_dive", "freightwaves", "36kr_japan", "pandaily"]:
-            return "global"
-            
-        # 2. Use Gemini for semantic classification (High accuracy)
-        prompt = f"""
-        あなたは物流メディアの編集長です。
-        以下の記事企画を、読者にとって最も価値のある5つの記事タイプ（フォーマット）のいずれかに分類してください。
+        title = title or ""
+        summary = summary or ""
 
-        記事タイトル: {title}
-        記事概要: {summary}
+        # 1. Local rule-based classification (no API cost)
+        rule_type, confidence, reason = self._rule_based_type(title, summary, source)
+        if rule_type and confidence >= self.RULE_CONFIDENCE_THRESHOLD:
+            print(f"  > Classification result: {rule_type} (method: rules, confidence: {confidence:.2f}, {reason})")
+            return rule_type
 
-        ## 選択肢 (以下のいずれか1つを選んでください)
-        1. know  (解説記事: 「WMSとは」「物流DXの仕組み」など、基礎知識や定義を解説)
-        2. buy   (比較記事: 「WMS比較」「おすすめ10選」「選び方」など、製品選定を支援)
-        3. do    (実践/事例: 「導入事例」「成功ノウハウ」「誤出荷ゼロへの道」など、具体的なハウツー)
-        4. news  (国内ニュース: 最新の行政動向、企業のプレスリリース、人事情報など速報値・時事性があるもの)
-        5. global (海外情報: 海外のトレンド、海外企業の事例、日本未上陸の技術)
-
-        ## 判定ルール
-        - 海外の国名や海外企業の話であれば「global」
-        - 「比較」「選定」「おすすめ」なら「buy」
-        - 「事例」「成功」「実践」なら「do」
-        - 「とは」「仕組み」「メリット」などの基礎解説なら「know」
-        - 特定の日付や「速報」などの時事性が強ければ「news」
-        
-        出力はタイプ名（know, buy, do, news, global）のみを小文字で返してください。
-        """
+        # 2. Use Gemini for semantic classification (High accuracy) on low-confidence cases
+        prompt = CLASSIFY_TYPE_TEMPLATE.render(title=title, summary=summary)
 
         try:
-            response = self.gemini.client.models.generate_content(
-                model='gemini-3-flash-preview',
+            response = self.gemini._routed_request(
+                "classification",
+                self.gemini.client.models.generate_content,
                 contents=prompt,
                 config={
                     'response_mime_type': 'text/plain'
@@ -156,12 +267,82 @@ class ArticleClassifier:
                     found_type = t
                     break
             
-            print(f"  > Classification result: {found_type} (Raw: {result})")
+            print(f"  > Classification result: {found_type} (method: llm, rule guess: {rule_type} @ {confidence:.2f}, Raw: {result})")
             return found_type
 
         except Exception as e:
             print(f"Type classification failed: {e}")
-            return "news" # Safe fallback
+            # Prefer the low-confidence local guess over a blind default
+            fallback = rule_type or "news"
+            print(f"  > Classification result: {fallback} (method: fallback, confidence: {confidence:.2f})")
+            return fallback
+
+    def classify(self, title, summary, source=""):
+        """
+        Classify article type, category and tags in a single Gemini call.
+        A confident local type skips the type part of the prompt (category/tags only).
+        Results are cached per article (source + title + summary).
+
+        Returns:
+            dict: {
+                "article_type": "know|buy|do|news|global",
+                "category": "slug",
+                "industry_tags": [...],
+                "theme_tags": [...],
+                "region_tags": [...]
+            }
+        """
+        title = title or ""
+        summary = summary or ""
+        cache_key = hashlib.sha1(f"{source}\n{title}\n{summary}".encode("utf-8")).hexdigest()
+        if cache_key in self._cache:
+            print("  > Classification result: (cached)")
+            return self._cache[cache_key]
+
+        rule_type, confidence, reason = self._rule_based_type(title, summary, source)
+        rule_confident = bool(rule_type) and confidence >= self.RULE_CONFIDENCE_THRESHOLD
+
+        if rule_confident:
+            prompt = CLASSIFY_ARTICLE_TEMPLATE.render(title=title, content_summary=summary)
+        else:
+            prompt = CLASSIFY_COMBINED_TEMPLATE.render(title=title, summary=summary)
+
+        result = {k: (list(v) if isinstance(v, list) else v) for k, v in DEFAULT_CLASSIFICATION.items()}
+        llm_type = None
+        try:
+            response = self.gemini._routed_request(
+                "classification",
+                self.gemini.client.models.generate_content,
+                contents=prompt,
+                config={
+                    'response_mime_type': 'application/json'
+                }
+            )
+            response_text = re.sub(r'```json\n|\n```', '', response.text).strip()
+            data = json.loads(response_text)
+            if isinstance(data, dict):
+                if isinstance(data.get("category"), str) and data["category"]:
+                    result["category"] = data["category"]
+                for key in ("industry_tags", "theme_tags", "region_tags"):
+                    if isinstance(data.get(key), list):
+                        result[key] = [t for t in data[key] if isinstance(t, str) and t]
+                llm_type = str(data.get("article_type", "")).strip().lower()
+        except Exception as e:
+            print(f"Combined classification failed: {e}")
+
+        # Confident local rules win for the type, as in classify_type
+        if rule_confident:
+            result["article_type"], method = rule_type, "rules"
+        elif llm_type in VALID_TYPES:
+            result["article_type"], method = llm_type, "llm"
+        else:
+            result["article_type"], method = rule_type or "news", "fallback"
+
+        print(f"  > Classification result: {result['article_type']} (method: {method}, rule confidence: {confidence:.2f}) "
+              f"category={result['category']} tags={result['industry_tags'] + result['theme_tags'] + result['region_tags']}")
+        self._cache[cache_key] = result
+        return result
+
 if __name__ == "__main__":
     # Test
     classifier = ArticleClassifier()
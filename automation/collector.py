@@ -1,10 +1,14 @@
 import argparse
-import feedparser
 import json
 import os
+import requests
 from datetime import datetime, timedelta
 from dateutil import parser as date_parser
 import time
+try:
+    from automation import fixture_archive
+except ImportError:
+    import fixture_archive
 
 # Default RSS Sources
 DEFAULT_SOURCES = {
@@ -34,10 +38,34 @@ DEFAULT_SOURCES = {
     "google_alert_3pl": "https://www.google.co.jp/alerts/feeds/09915549032368953872/14418106855303433847"
 }
 
+def _download(url):
+    response = requests.get(url, headers={"User-Agent": "Mozilla/5.0 (compatible; LogiShiftBot/1.0)"}, timeout=30)
+    response.raise_for_status()
+    return response.content
+
 def fetch_rss(url, source_name, days=None, hours=None):
     """Fetches and parses an RSS feed."""
     print(f"Fetching {source_name} from {url}...")
-    feed = feedparser.parse(url)
+    if fixture_archive.mode() == fixture_archive.MODE_OFF:
+        # feedparser fetches the URL itself
+        data, recorded_at = url, None
+    else:
+        # Record/replay raw feed bytes (see fixture_archive.py)
+        try:
+            data, recorded_at = fixture_archive.fetch(fixture_archive.KIND_RSS, url, source_name, lambda: _download(url))
+        except Exception as e:
+            print(f"Warning: Failed to fetch feed {source_name}: {e}")
+            return []
+    return parse_feed(data, source_name, days=days, hours=hours, now=recorded_at)
+
+def parse_feed(data, source_name, days=None, hours=None, now=None):
+    """
+    Parse a feed (URL, bytes or string) into article dicts.
+    now: Reference time for the recency filter (default: current time; replayed feeds use their recording time)
+    """
+    # Imported here: feedparser is only needed once feeds are actually parsed
+    import feedparser
+    feed = feedparser.parse(data)
     articles = []
     
     if feed.bozo:
@@ -65,10 +93,12 @@ def fetch_rss(url, source_name, days=None, hours=None):
         if published_parsed:
              # Make offset-naive for comparison if needed, or handle timezones properly
              # Simple check: if within last 2 days
-             if published_parsed.tzinfo is not None:
-                 now = datetime.now(published_parsed.tzinfo)
+             if now is not None:
+                 reference = now.astimezone(published_parsed.tzinfo) if published_parsed.tzinfo else now.astimezone().replace(tzinfo=None)
+             elif published_parsed.tzinfo is not None:
+                 reference = datetime.now(published_parsed.tzinfo)
              else:
-                 now = datetime.now()
+                 reference = datetime.now()
                  
              # Determine cutoff
              if hours:
@@ -78,7 +108,7 @@ def fetch_rss(url, source_name, days=None, hours=None):
              else:
                  cutoff = timedelta(days=2) # Default to 2 days
 
-             if (now - published_parsed) <= cutoff:
+             if (reference - published_parsed) <= cutoff:
                  is_recent = True
         else:
             # If no date, assume it's recent enough or skip? Let's include for now.
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Recorded Fixture Archive for LogiShift
+
+Record/replay layer for the network reads of collector.fetch_rss (feeds) and
+url_reader.extract_content (article pages):
+- record: fetch from the network and store raw responses in a compressed archive
+- replay: serve responses from the archive without any network access
+
+Feed recency is evaluated against the recording time during replay, so a
+replayed feed yields the same articles it did when it was recorded.
+
+The archive is a ZIP file (index.json + one deflated member per response).
+The parse micro-benchmark (--bench) times feedparser / BeautifulSoup per source
+against the archive and can compare with a saved baseline.
+
+Configuration (environment):
+- LOGISHIFT_FIXTURE_MODE: "record" or "replay" (unset = normal network access)
+- LOGISHIFT_FIXTURE_ARCHIVE: Archive path (default: automation/benchmark_fixtures/recorded.zip)
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import zipfile
+from datetime import datetime, timezone
+
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures", "recorded.zip")
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+KIND_RSS = "rss"
+KIND_PAGE = "page"
+_EXTENSIONS = {KIND_RSS: "xml", KIND_PAGE: "html"}
+
+
+class FixtureNotFound(LookupError):
+    """Raised in replay mode when a URL was never recorded."""
+
+
+def _key(kind, url):
+    return f"{kind}:{url}"
+
+
+class FixtureArchive:
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        self.index = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with zipfile.ZipFile(path) as zf:
+                self.index = json.loads(zf.read("index.json"))
+
+    def get(self, kind, url):
+        """Return (body bytes, entry metadata) or None if the URL is not recorded."""
+        with self._lock:
+            entry = self.index.get(_key(kind, url))
+            if entry is None:
+                return None
+            body = self._pending.get(entry["member"])
+            if body is None:
+                with zipfile.ZipFile(self.path) as zf:
+                    body = zf.read(entry["member"])
+        return body, entry
+
+    def put(self, kind, url, body, source):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        member = f"{kind}/{source}/{digest}.{_EXTENSIONS[kind]}"
+        with self._lock:
+            self.index[_key(kind, url)] = {
+                "kind": kind,
+                "url": url,
+                "source": source,
+                "member": member,
+                "size": len(body),
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+            self._pending[member] = body
+
+    def entries(self, kind=None):
+        return [e for e in self.index.values() if kind is None or e["kind"] == kind]
+
+    def save(self):
+        """Write recorded responses, keeping existing members that were not re-recorded."""
+        with self._lock:
+            if not self._pending:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as out:
+                if os.path.exists(self.path):
+                    with zipfile.ZipFile(self.path) as old:
+                        for name in old.namelist():
+                            if name != "index.json" and name not in self._pending:
+                                out.writestr(name, old.read(name))
+                for member, body in self._pending.items():
+                    out.writestr(member, body)
+                out.writestr("index.json", json.dumps(self.index, ensure_ascii=False, indent=1))
+            os.replace(tmp_path, self.path)
+            print(f"Saved {len(self._pending)} recorded response(s) to {self.path}")
+            self._pending = {}
+
+
+_mode = None
+_archive = None
+
+
+def configure(mode=None, path=None):
+    """Set the fixture mode; defaults come from LOGISHIFT_FIXTURE_MODE / LOGISHIFT_FIXTURE_ARCHIVE."""
+    global _mode, _archive
+    mode = mode or os.getenv("LOGISHIFT_FIXTURE_MODE") or MODE_OFF
+    if mode not in (MODE_OFF, MODE_RECORD, MODE_REPLAY):
+        raise ValueError(f"Unknown fixture mode: {mode}")
+    _mode = mode
+    _archive = None
+    if mode != MODE_OFF:
+        path = path or os.getenv("LOGISHIFT_FIXTURE_ARCHIVE", DEFAULT_ARCHIVE_PATH)
+        if mode == MODE_REPLAY and not os.path.exists(path):
+            raise FileNotFoundError(f"Fixture archive not found: {path}")
+        _archive = FixtureArchive(path)
+        if mode == MODE_RECORD:
+            atexit.register(_archive.save)
+        print(f"Fixture {mode} mode: {path}")
+    return _archive
+
+
+def mode():
+    if _mode is None:
+        configure()
+    return _mode
+
+
+def fetch(kind, url, source, fetcher):
+    """
+    Return (body bytes, recorded_at datetime or None) for a URL.
+    fetcher() performs the real network read and returns bytes (off/record modes).
+    """
+    current = mode()
+    if current == MODE_REPLAY:
+        hit = _archive.get(kind, url)
+        if hit is None:
+            raise FixtureNotFound(f"No recorded {kind} fixture for {url}")
+        body, entry = hit
+        return body, datetime.fromisoformat(entry["recorded_at"])
+    body = fetcher()
+    if current == MODE_RECORD:
+        _archive.put(kind, url, body, source)
+    return body, None
+
+
+def _time_parse(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_parse_benchmark(archive, repeat=5):
+    """Median parse time per (kind, source) for every recorded response."""
+    try:
+        from automation.collector import parse_feed
+        from automation.url_reader import parse_content
+    except ImportError:
+        from collector import parse_feed
+        from url_reader import parse_content
+
+    rows = {}
+    for entry in sorted(archive.entries(), key=lambda e: (e["kind"], e["source"])):
+        body, _ = archive.get(entry["kind"], entry["url"])
+        reference = datetime.fromisoformat(entry["recorded_at"])
+        if entry["kind"] == KIND_RSS:
+            func = lambda: parse_feed(body, entry["source"], now=reference)
+        else:
+            func = lambda: parse_content(body, entry["url"], entry["source"])
+        row = rows.setdefault(f"{entry['kind']}:{entry['source']}", {
+            "kind": entry["kind"], "source": entry["source"], "responses": 0, "kb": 0.0, "parse_ms": 0.0})
+        row["responses"] += 1
+        row["kb"] += len(body) / 1024
+        row["parse_ms"] += _time_parse(func, repeat)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record feeds/pages into a fixture archive and benchmark parsing offline.")
+    parser.add_argument("--archive", type=str, default=DEFAULT_ARCHIVE_PATH, help="Archive path")
+    parser.add_argument("--record", action="store_true", help="Record all configured feeds and their article pages")
+    parser.add_argument("--source", type=str, default="all", help="Comma-separated source keys to record (default: all)")
+    parser.add_argument("--pages-per-source", type=int, default=3, help="Article pages to record per feed (default: 3)")
+    parser.add_argument("--bench", action="store_true", help="Time feedparser/BeautifulSoup parsing per source")
+    parser.add_argument("--repeat", type=int, default=5, help="Parse repetitions per response (median is reported)")
+    parser.add_argument("--json", type=str, help="Save benchmark results to this JSON file")
+    parser.add_argument("--baseline", type=str, help="Benchmark JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (default: 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    if args.record:
+        try:
+            from automation.collector import fetch_rss, DEFAULT_SOURCES
+            from automation.url_reader import extract_content
+        except ImportError:
+            from collector import fetch_rss, DEFAULT_SOURCES
+            from url_reader import extract_content
+        configure(MODE_RECORD, args.archive)
+        sources = DEFAULT_SOURCES if args.source == "all" else {
+            k.strip(): DEFAULT_SOURCES[k.strip()] for k in args.source.split(",") if k.strip() in DEFAULT_SOURCES}
+        for name, url in sources.items():
+            # Wide window so the recorded feed also yields pages to record
+            articles = fetch_rss(url, name, days=30)
+            for article in articles[:args.pages_per_source]:
+                extract_content(article["url"], name)
+        _archive.save()
+
+    if args.bench:
+        if not os.path.exists(args.archive):
+            print(f"Archive not found: {args.archive}. Record one first with --record.")
+            sys.exit(1)
+        rows = run_parse_benchmark(FixtureArchive(args.archive), repeat=args.repeat)
+        baseline = {}
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)["rows"]
+
+        regressions = []
+        print(f"{'Kind':<6}{'Source':<32}{'Resp':>5}{'KB':>9}{'Parse ms':>10}{'Baseline':>10}")
+        for key, row in rows.items():
+            base = baseline.get(key, {}).get("parse_ms")
+            flag = ""
+            if base and row["parse_ms"] > base * (1 + args.tolerance):
+                flag = "  << slower"
+                regressions.append(key)
+            base_text = f"{base:>10.2f}" if base else f"{'-':>10}"
+            print(f"{row['kind']:<6}{row['source'][:31]:<32}{row['responses']:>5}{row['kb']:>9.1f}{row['parse_ms']:>10.2f}{base_text}{flag}")
+        for kind in (KIND_RSS, KIND_PAGE):
+            total = sum(r["parse_ms"] for r in rows.values() if r["kind"] == kind)
+            print(f"Total {kind} parse: {total:.1f} ms")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"created_at": datetime.now().isoformat(timespec="seconds"), "repeat": args.repeat,
+                           "rows": rows}, f, indent=2, ensure_ascii=False)
+            print(f"Results saved to: {args.json}")
+        if regressions:
+            print(f"\n{len(regressions)} source(s) slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+    if not args.record and not args.bench:
+        if os.path.exists(args.archive):
+            archive = FixtureArchive(args.archive)
+            for entry in sorted(archive.entries(), key=lambda e: (e["kind"], e["source"])):
+                print(f"{entry['kind']:<5} {entry['source']:<28} {entry['size'] // 1024:>6} KB  {entry['recorded_at']}  {entry['url']}")
+        else:
+            parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,25 @@ import argparse
 import sys
 import re
 import json
-import markdown
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client
     from automation.wp_client import WordPressClient
     from automation.classifier import ArticleClassifier
     from automation.internal_linker import InternalLinkSuggester
+    from automation.image_processor import prepare_for_upload, discard_source
+    from automation.tracing import stage
+    from automation.markdown_renderer import render_html, clean_markdown, strip_tags, record_post_id
 except ImportError:
     import gemini_client
-    from gemini_client import GeminiClient
+    from gemini_client import get_client
     from wp_client import WordPressClient
     from classifier import ArticleClassifier
     from internal_linker import InternalLinkSuggester
+    from image_processor import prepare_for_upload, discard_source
+    from tracing import stage
+    from markdown_renderer import render_html, clean_markdown, strip_tags, record_post_id
 
 def parse_article_content(text):
     """
@@ -38,6 +44,32 @@ def parse_article_content(text):
     content = "\n".join(lines[content_start_index:]).strip()
     return title, content
 
+# With streamed generation, the hero image and classification start once the title
+# and first section are available (or after this many body characters)
+EARLY_START_CHARS = 1000
+
+def early_article_head(text):
+    """
+    Return (title, head) once streamed text contains a complete title line and its
+    first section (or EARLY_START_CHARS of body), otherwise None.
+    """
+    lines = text.split('\n')
+    # The last line may still be incomplete
+    for i, line in enumerate(lines[:-1]):
+        if line.strip().startswith('#'):
+            title = line.strip().lstrip('#').strip()
+            body = "\n".join(lines[i + 1:])
+            break
+    else:
+        return None
+
+    headings = [m.start() for m in re.finditer(r'^##\s', body, re.M)]
+    if len(headings) >= 2:
+        return title, body[:headings[1]].strip()
+    if len(body) >= EARLY_START_CHARS:
+        return title, body[:EARLY_START_CHARS].strip()
+    return None
+
 def parse_schedule_date(schedule_str):
     """
     Parse schedule string to ISO 8601 format for WordPress.
@@ -84,14 +116,60 @@ keyword: {keyword}
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(file_content)
         print(f"Saved local copy to: {filepath}")
+        return filepath
     except Exception as e:
         print(f"Warning: Failed to save local file: {e}")
+        return None
+
+def _generate_hero_image(gemini, keyword, title, content_summary, article_type, image_path):
+    """Image prompt + image generation (may run in a background thread, so article is passed explicitly)."""
+    try:
+        with stage("image_prompt", article=keyword):
+            image_prompt = gemini.generate_image_prompt(title, content_summary, article_type)
+        print(f"Image prompt: {image_prompt}")
+        
+        with stage("image", article=keyword):
+            return gemini.generate_image(image_prompt, image_path, aspect_ratio="16:9")
+    except Exception as e:
+        print(f"Hero image generation failed: {e}")
+        return None
 
-def generate_article_flow(keyword, article_type='know', dry_run=False, schedule=None, context=None, gemini_client=None, wp_client=None):
+def _classify_content(gemini, keyword, title, content_summary):
+    try:
+        # Pass initialized client to ArticleClassifier
+        classifier = ArticleClassifier(client=gemini)
+        with stage("classification", article=keyword):
+            classification = classifier.classify_article(title, content_summary)
+        print(f"Classification Result: {classification}")
+        return classification
+    except Exception as e:
+        print(f"Classification failed: {e}")
+        return {}
+
+def _after(stale, func, *args):
+    """Run func once the stale job is cancelled or finished (both write the same image file)."""
+    if not stale.cancel():
+        wait([stale])
+    return func(*args)
+
+def generate_article_flow(keyword, article_type='know', dry_run=False, schedule=None, context=None, gemini_client=None, wp_client=None, classification=None, stream=True):
     """
     Main flow to generate and post an article.
     Designed to be called from pipeline.py or main().
+
+    classification: Result of ArticleClassifier.classify() computed upstream.
+        When given, the post-generation classify_article call is skipped.
+    stream: Stream the article and start the hero image (and classification)
+        as soon as the title and first section are available.
     """
+    # Each step below is traced as a stage of this article (see tracing.py)
+    with stage("article", article=keyword) as record:
+        success = _generate_article_flow(keyword, article_type, dry_run, schedule, context, gemini_client, wp_client, classification, stream)
+        if not success:
+            record["status"] = "failed"
+        return success
+
+def _generate_article_flow(keyword, article_type, dry_run, schedule, context, gemini_client, wp_client, classification, stream=True):
     import os
     
     # Define output directory
@@ -104,7 +182,7 @@ def generate_article_flow(keyword, article_type='know', dry_run=False, schedule=
     # 1. Initialize Clients (if not provided)
     if gemini_client is None:
         try:
-            gemini = GeminiClient()
+            gemini = get_client()
         except Exception as e:
             print(f"Failed to initialize Gemini Client: {e}")
             return False
@@ -135,7 +213,8 @@ def generate_article_flow(keyword, article_type='know', dry_run=False, schedule=
             print("--- Internal Link Suggester ---")
             linker = InternalLinkSuggester(wp_client, gemini)
             # Limit to 50 for performance during generation
-            candidates = linker.fetch_candidates(limit=50) 
+            with stage("internal_links_fetch"):
+                candidates = linker.fetch_candidates(limit=50)
             
             if candidates:
                 # Simple context for scoring
@@ -151,7 +230,8 @@ def generate_article_flow(keyword, article_type='know', dry_run=False, schedule=
                 if context_dict:
                     scoring_context += f"\nSummary: {context_dict.get('summary', '')}"
                     
-                relevant_links = linker.score_relevance(keyword, scoring_context, candidates)
+                with stage("internal_links_score"):
+                    relevant_links = linker.score_relevance(keyword, scoring_context, candidates)
                 
                 if relevant_links:
                     print(f"Found {len(relevant_links)} relevant articles for linking.")
@@ -217,13 +297,55 @@ Select the most relevant ones (if any) and include them in the article using sta
         except:
              pass
 
-    generated_text = gemini.generate_article(keyword, article_type=article_type, context=context_obj, extra_instructions=extra_instructions)
+    date_str = datetime.now().strftime("%Y-%m-%d")
+    safe_keyword = re.sub(r'[\\/*?:"\<\>| ]', '_', keyword)
+    image_filename = f"{date_str}_{safe_keyword}_hero.png"
+    image_path = os.path.join(OUTPUT_DIR, image_filename)
+
+    # Jobs started from the stream once the title and first section are known
+    early_jobs = {}
+    # Title the early jobs were started with, and whether a retry restarted the stream afterwards
+    stream_state = {"title": None, "length": 0, "restarted": False}
+    executor = ThreadPoolExecutor(max_workers=2) if stream else None
+
+    def on_progress(text):
+        if len(text) < stream_state["length"]:
+            # A retry (e.g. quota fallback) streams the article again from the start
+            stream_state["restarted"] = True
+        stream_state["length"] = len(text)
+        if early_jobs:
+            return
+        head = early_article_head(text)
+        if head is None:
+            return
+        early_title, early_content = head
+        stream_state["title"] = early_title
+        print(f"Title available while streaming: {early_title} (starting hero image in background)")
+        early_jobs["image"] = executor.submit(_generate_hero_image, gemini, keyword, early_title, early_content[:1000], article_type, image_path)
+        if not classification:
+            early_jobs["classification"] = executor.submit(_classify_content, gemini, keyword, early_title, early_content[:1000])
+
+    with stage("generation"):
+        generated_text = gemini.generate_article(keyword, article_type=article_type, context=context_obj, extra_instructions=extra_instructions,
+                                                 on_progress=on_progress if stream else None)
     
     if not generated_text:
+        if executor:
+            # Nothing will use the early results; don't wait for the image
+            executor.shutdown(wait=False, cancel_futures=True)
         print("Failed to generate content.")
         return False
         
     title, content = parse_article_content(generated_text)
+
+    if stream_state["restarted"] and early_jobs and stream_state["title"] != title:
+        # The early jobs were started from an attempt that was thrown away
+        print(f"Stream restarted with a different title; regenerating hero image and classification for: {title}")
+        stale_image = early_jobs["image"]
+        early_jobs["image"] = executor.submit(_after, stale_image, _generate_hero_image, gemini, keyword, title, content[:1000], article_type, image_path)
+        if "classification" in early_jobs:
+            early_jobs["classification"].cancel()
+            early_jobs["classification"] = executor.submit(_classify_content, gemini, keyword, title, content[:1000])
     
     print(f"Generated Title: {title}")
     print(f"Content Length: {len(content)} chars")
@@ -243,7 +365,8 @@ Select the most relevant ones (if any) and include them in the article using sta
         optimizer = SEOOptimizer(client=gemini)
         
         # Generate Meta Description
-        meta_desc = optimizer.generate_meta_description(title, content, keyword)
+        with stage("seo_meta"):
+            meta_desc = optimizer.generate_meta_description(title, content, keyword)
         print(f"Meta Description: {meta_desc}")
         
         # Optimize Title
@@ -257,21 +380,18 @@ Select the most relevant ones (if any) and include them in the article using sta
     # 2.5 Generate Hero Image
     print("Generating hero image...")
     
-    # Generate contextual image prompt based on article content
-    content_summary = content[:1000]  # Use first 1000 chars as summary
-    image_prompt = gemini.generate_image_prompt(title, content_summary, article_type)
-    print(f"Image prompt: {image_prompt}")
-    
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    safe_keyword = re.sub(r'[\\/*?:"\<\>| ]', '_', keyword)
-    image_filename = f"{date_str}_{safe_keyword}_hero.png"
-    image_path = os.path.join(OUTPUT_DIR, image_filename)
-    
-    generated_image_path = gemini.generate_image(image_prompt, image_path, aspect_ratio="16:9")
+    if "image" in early_jobs:
+        # Started while the article was streaming
+        generated_image_path = early_jobs["image"].result()
+    else:
+        # Generate contextual image prompt based on article content
+        content_summary = content[:1000]  # Use first 1000 chars as summary
+        generated_image_path = _generate_hero_image(gemini, keyword, title, content_summary, article_type, image_path)
     
+    local_path = None
     if generated_image_path:
         # Re-save the file (without inserting image into content)
-        save_to_file(title, content, keyword)
+        local_path = save_to_file(title, content, keyword)
         print(f"Hero image generated: {image_filename}")
     
     # 3. Classify Content
@@ -279,20 +399,21 @@ Select the most relevant ones (if any) and include them in the article using sta
     category_id = None
     tag_ids = []
     
-    try:
-        # Pass initialized client to ArticleClassifier
-        classifier = ArticleClassifier(client=gemini)
-        classification = classifier.classify_article(title, content[:1000])
-        print(f"Classification Result: {classification}")
-        
-    except Exception as e:
-        print(f"Classification failed: {e}")
-        classification = {}
+    if classification:
+        print(f"Classification Result (from pipeline): {classification}")
+    elif "classification" in early_jobs:
+        classification = early_jobs["classification"].result()
+    else:
+        classification = _classify_content(gemini, keyword, title, content[:1000])
+    
+    if executor:
+        executor.shutdown(wait=False)
 
     # 4. Generate AI Structured Summary
     print("Generating AI Structured Summary...")
-    text_content_for_summary = re.sub('<[^<]+?>', '', content)
-    structured_summary = gemini.generate_structured_summary(text_content_for_summary)
+    text_content_for_summary = strip_tags(content)
+    with stage("structured_summary"):
+        structured_summary = gemini.generate_structured_summary(text_content_for_summary)
     
     if structured_summary:
         print("  - Structured summary generated.")
@@ -318,29 +439,34 @@ Select the most relevant ones (if any) and include them in the article using sta
         wp = wp_client
         
         # Resolve Categories and Tags
-        if classification:
-            cat_slug = classification.get("category")
-            if cat_slug:
-                cat_id = wp.get_category_id(cat_slug)
-                if cat_id:
-                    category_id = [cat_id]
-                    print(f"Resolved Category: {cat_slug} -> {cat_id}")
+        with stage("wp_taxonomy"):
+            if classification:
+                cat_slug = classification.get("category")
+                if cat_slug:
+                    cat_id = wp.get_category_id(cat_slug)
+                    if cat_id:
+                        category_id = [cat_id]
+                        print(f"Resolved Category: {cat_slug} -> {cat_id}")
             
-            t_slugs = classification.get("industry_tags", []) + classification.get("theme_tags", []) + classification.get("region_tags", [])
-            for t_slug in t_slugs:
-                t_id = wp.get_tag_id(t_slug)
-                if t_id:
-                    tag_ids.append(t_id)
-            print(f"Resolved Tags: {t_slugs} -> {tag_ids}")
+                t_slugs = classification.get("industry_tags", []) + classification.get("theme_tags", []) + classification.get("region_tags", [])
+                for t_slug in t_slugs:
+                    t_id = wp.get_tag_id(t_slug)
+                    if t_id:
+                        tag_ids.append(t_id)
+                print(f"Resolved Tags: {t_slugs} -> {tag_ids}")
 
         featured_media_id = None
 
         # Upload generated hero image explicitly
         if generated_image_path and os.path.exists(generated_image_path):
-            print(f"Uploading hero image to WordPress: {image_filename}")
-            media_result = wp.upload_media(generated_image_path, alt_text=keyword)
+            # Upload a compressed WebP (the local PNG is removed once it is on WordPress)
+            with stage("image_upload"):
+                upload_path = prepare_for_upload(generated_image_path)
+                print(f"Uploading hero image to WordPress: {os.path.basename(upload_path)}")
+                media_result = wp.upload_media(upload_path, alt_text=keyword, title=optimized_title)
             if media_result and 'id' in media_result:
                 featured_media_id = media_result['id']
+                discard_source(generated_image_path, upload_path)
                 print(f"Set as featured media ID: {featured_media_id}")
             else:
                 print(f"Failed to upload hero image.")
@@ -369,12 +495,9 @@ Select the most relevant ones (if any) and include them in the article using sta
                         print(f"Failed to upload image: {match_filename}")
 
 
-        # Clean up HTML tags
-        content = re.sub(r'<br\s*/?>\s*', ' ', content)
-        content = re.sub(r'<([^>]+)>', '', content)
-        
-        # Convert Markdown to HTML
-        html_content = markdown.markdown(content, extensions=['extra', 'nl2br', 'tables'])
+        # Clean up HTML tags and convert Markdown to HTML (shared renderer)
+        content = clean_markdown(content)
+        html_content = render_html(content, "article")
         
         # Determine status and date
         if schedule:
@@ -397,20 +520,23 @@ Select the most relevant ones (if any) and include them in the article using sta
         if structured_summary:
             meta_fields["ai_structured_summary"] = json.dumps(structured_summary, ensure_ascii=False)
 
-        result = wp.create_post(
-            title=optimized_title, 
-            content=html_content, 
-            status=status,
-            date=schedule_date,
-            categories=category_id,
-            tags=tag_ids,
-            featured_media=featured_media_id,
-            excerpt=meta_desc,
-            meta=meta_fields
-        )
+        with stage("wp_post"):
+            result = wp.create_post(
+                title=optimized_title, 
+                content=html_content, 
+                status=status,
+                date=schedule_date,
+                categories=category_id,
+                tags=tag_ids,
+                featured_media=featured_media_id,
+                excerpt=meta_desc,
+                meta=meta_fields
+            )
         
         if result:
             print(f"Successfully created post. ID: {result.get('id')}")
+            if local_path and result.get('id'):
+                record_post_id(local_path, result['id'])
             print(f"Link: {result.get('link')}")
             
             # --- SNS Posting (X/Twitter) ---
@@ -427,7 +553,8 @@ Select the most relevant ones (if any) and include them in the article using sta
                         print("Generating SNS content...")
                         # Pass URL to generate_sns_content
                         link = result.get('link')
-                        sns_content_data = gemini.generate_sns_content(optimized_title, content, article_type, url=link)
+                        with stage("sns_copy"):
+                            sns_content_data = gemini.generate_sns_content(optimized_title, content, article_type, url=link)
                         
                         if sns_content_data:
                             post_text = f"{sns_content_data.get('hook', optimized_title)}\n\n"
@@ -452,7 +579,8 @@ Select the most relevant ones (if any) and include them in the article using sta
                             print(f"Posting to X:\n{post_text}")
                             print("--------------------------------------------------")
                             
-                            sns.post_to_x(post_text)
+                            with stage("sns_post"):
+                                sns.post_to_x(post_text)
                         else:
                              print("Failed to generate SNS content data.")
                     else:
@@ -469,7 +597,8 @@ Select the most relevant ones (if any) and include them in the article using sta
                         if sns_content_data:
                              # Re-construct text if needed, or just reuse post_text
                              # (post_text includes URL)
-                             sns.post_to_threads(post_text)
+                             with stage("sns_post"):
+                                 sns.post_to_threads(post_text)
                         else:
                              print("Skipping Threads post: No content data.")
                     else:
@@ -494,6 +623,7 @@ def main():
     parser.add_argument('--dry-run', action='store_true', help='Generate content but do not post to WordPress')
     parser.add_argument('--schedule', type=str, help='Schedule date (YYYY-MM-DD HH:MM or YYYY-MM-DD HH:MM:SS)')
     parser.add_argument('--context', type=str, help='Article context for News/Global articles (JSON string, optional)')
+    parser.add_argument('--no-stream', action='store_true', help='Wait for the full article before starting image generation')
     
     args = parser.parse_args()
     
@@ -502,7 +632,8 @@ def main():
         article_type=args.type,
         dry_run=args.dry_run,
         schedule=args.schedule,
-        context=args.context
+        context=args.context,
+        stream=not args.no_stream
     )
     
     if not success:
@@ -11,24 +11,25 @@ import argparse
 import os
 import sys
 import json
-import re
 from datetime import datetime
 
 # Adjust path to import automation modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client
     from automation.wp_client import WordPressClient
     from automation.internal_linker import InternalLinkSuggester
     from automation.seo_optimizer import SEOOptimizer
+    from automation.image_processor import prepare_for_upload, discard_source
+    from automation.markdown_renderer import render_html, strip_tags, split_frontmatter
 except ImportError:
-    from gemini_client import GeminiClient
+    from gemini_client import get_client
     from wp_client import WordPressClient
     from internal_linker import InternalLinkSuggester
     from seo_optimizer import SEOOptimizer
-
-import markdown
+    from markdown_renderer import render_html, strip_tags, split_frontmatter
+    from image_processor import prepare_for_upload, discard_source
 
 CONFIGS = {
     "us_inventory": {
@@ -304,7 +305,7 @@ def generate_cluster_article(target_key, dry_run=False):
     
     # 1. Init clients
     print("Initializing clients...")
-    gemini = GeminiClient()
+    gemini = get_client()
     seo = SEOOptimizer(client=gemini)
     try:
         wp = WordPressClient()
@@ -348,7 +349,7 @@ def generate_cluster_article(target_key, dry_run=False):
 """
 
     print("Requesting content from Gemini (this may take a minute)...")
-    response = gemini.generate_content(prompt)
+    response = gemini.generate_content(prompt, task="cluster_article")
     
     if not response or not response.text:
         print("Failed to generate content.")
@@ -394,9 +395,11 @@ def generate_cluster_article(target_key, dry_run=False):
                 print(f"✅ Hero image generated successfully: {image_filename}")
                 if wp:
                     print("Uploading image to WordPress...")
-                    media_data = wp.upload_media(image_path, alt_text=f"Hero image for {config['title']}")
+                    upload_path = prepare_for_upload(image_path)
+                    media_data = wp.upload_media(upload_path, alt_text=f"Hero image for {config['title']}")
                     if media_data:
                         media_id = media_data.get('id')
+                        discard_source(image_path, upload_path)
                         print(f"✅ Image uploaded, ID: {media_id}")
             else:
                 print("⚠️ Failed to generate hero image.")
@@ -409,12 +412,9 @@ def generate_cluster_article(target_key, dry_run=False):
             try:
                 import requests
                 # Convert markdown to HTML (removing frontmatter if present)
-                md_content = content
-                yaml_match = re.match(r"^---\n(.*?)\n---", content, re.DOTALL)
-                if yaml_match:
-                    md_content = content[yaml_match.end():].strip()
-                html_content = markdown.markdown(md_content, extensions=['tables', 'fenced_code'])
-                text_content = re.sub('<[^<]+?>', '', html_content)
+                _, md_content = split_frontmatter(content)
+                html_content = render_html(md_content, "cluster")
+                text_content = strip_tags(html_content)
                 
                 # Generate SEO meta
                 print("Generating SEO Metadata...")
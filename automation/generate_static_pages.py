@@ -8,9 +8,9 @@ Generate and publish static pages (privacy policy, about, contact) using Gemini
 import os
 import sys
 import argparse
-import markdown
-from gemini_client import GeminiClient
+from gemini_client import get_client
 from wp_client import WordPressClient
+from markdown_renderer import render_html
 
 # Page configurations
 PAGE_CONFIGS = {
@@ -74,10 +74,7 @@ def publish_page(wp_client, title, markdown_content, slug, dry_run=False):
         True if successful, False otherwise
     """
     # Convert Markdown to HTML
-    html_content = markdown.markdown(
-        markdown_content,
-        extensions=['extra', 'nl2br', 'sane_lists']
-    )
+    html_content = render_html(markdown_content, "static_page")
     
     if dry_run:
         print(f"\n{'='*60}")
@@ -139,7 +136,7 @@ def main():
     # Initialize clients
     try:
         print("Initializing Gemini API client...")
-        gemini_client = GeminiClient()
+        gemini_client = get_client()
         print("✅ Gemini API client initialized")
         
         print("Initializing WordPress API client...")
@@ -3,23 +3,28 @@ import json
 import os
 import sys
 import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import re
-import markdown
 
 # Add parent directory to path to allow imports from automation package if run directly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client, estimate_tokens
     from automation.wp_client import WordPressClient
     from automation.seo_optimizer import SEOOptimizer
+    from automation.image_processor import prepare_for_upload, discard_source
+    from automation.markdown_renderer import render_html, strip_tags, record_post_id
 except ImportError:
     # Fallback for local run
     import gemini_client
-    from gemini_client import GeminiClient
+    from gemini_client import get_client, estimate_tokens
     from wp_client import WordPressClient
     from seo_optimizer import SEOOptimizer
+    from image_processor import prepare_for_upload, discard_source
+    from markdown_renderer import render_html, strip_tags, record_post_id
 
 def parse_article_content(text):
     """
@@ -40,10 +45,170 @@ def parse_article_content(text):
     content = "\n".join(lines[content_start_index:]).strip()
     return title, content
 
+# Fields needed for the weekly context; full content is only fetched for posts without a stored summary
+SUMMARY_FIELDS = ["id", "title", "link", "meta"]
+CONTENT_FIELDS = ["id", "title", "link", "content"]
+
+# Cap on the plain text sent for a post that has no structured summary
+FALLBACK_CONTENT_CHARS = 4000
+
+
+def strip_html(html):
+    text = strip_tags(html).strip()
+    # Reduce multiple newlines
+    return re.sub(r'\n\s*\n', '\n', text)
+
+
+def stored_summary(post):
+    """Return the post's ai_structured_summary meta as a dict, or None."""
+    value = (post.get('meta') or {}).get('ai_structured_summary')
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return None
+    try:
+        data = json.loads(value)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) and data.get('summary') else None
+
+
+def full_text_item(post, limit=None):
+    content = strip_html(post['content']['rendered'])
+    return {
+        "title": post['title']['rendered'],
+        "url": post['link'],
+        "content": content[:limit] if limit else content
+    }
+
+
+def collect_week_items(wp, after):
+    """
+    Build one context item per post published after `after`, paging through the
+    whole window. Posts with a stored structured summary contribute that summary;
+    only the remaining posts are fetched again with their full content.
+    """
+    items = {}
+    missing = []
+    for post in wp.iter_posts(after=after, status="publish", fields=SUMMARY_FIELDS):
+        summary = stored_summary(post)
+        if summary:
+            items[post['id']] = {
+                "title": post['title']['rendered'],
+                "url": post['link'],
+                "summary": summary.get('summary', ''),
+                "topics": summary.get('key_topics', []),
+                "entities": summary.get('entities', [])
+            }
+        else:
+            items[post['id']] = None
+            missing.append(post['id'])
+
+    if missing:
+        print(f"{len(missing)}/{len(items)} posts have no structured summary; fetching their full text.")
+        for start in range(0, len(missing), 100):
+            for post in wp.iter_posts(status="publish", include=missing[start:start + 100], fields=CONTENT_FIELDS):
+                items[post['id']] = full_text_item(post, limit=FALLBACK_CONTENT_CHARS)
+
+    # Keep publication order (newest first); drop posts whose content could not be fetched
+    return [item for item in items.values() if item]
+
+
+def build_context(items):
+    context_str = ""
+    for item in items:
+        if "summary" in item:
+            context_str += f"""
+[Title] {item['title']}
+[URL] {item['url']}
+[Summary] {item['summary']}
+[Topics] {', '.join(item['topics'])}
+[Entities] {', '.join(item['entities'])}
+-------------------
+"""
+        else:
+            context_str += f"""
+[Title] {item['title']}
+[URL] {item['url']}
+[Content] {item['content']}
+-------------------
+"""
+    return context_str
+
+
+# Map-reduce mode: used automatically above these sizes (single prompt otherwise)
+MAP_REDUCE_MIN_POSTS = 25
+MAP_REDUCE_MIN_TOKENS = 30000
+# Posts per topic cluster in the map step (larger topics are split)
+CLUSTER_MAX_POSTS = 8
+OTHER_TOPIC = "その他の動き"
+
+
+def cluster_items(items, max_size=CLUSTER_MAX_POSTS):
+    """
+    Group the week's items by topic without calling the API.
+    Each item joins the cluster of its most widespread key topic (shared by the
+    most posts this week); items without a topic shared with another post, or
+    without a structured summary, go to OTHER_TOPIC. Clusters larger than
+    max_size are split so every map prompt stays bounded.
+
+    Returns a list of (topic, items) in descending cluster size.
+    """
+    counts = Counter(topic for item in items for topic in set(item.get("topics", [])))
+    groups = {}
+    for item in items:
+        topics = [t for t in set(item.get("topics", [])) if counts[t] > 1]
+        # Most widespread topic first; ties broken by name so runs are reproducible
+        topic = min(topics, key=lambda t: (-counts[t], t)) if topics else OTHER_TOPIC
+        groups.setdefault(topic, []).append(item)
+
+    clusters = []
+    for topic, members in sorted(groups.items(), key=lambda g: (g[0] == OTHER_TOPIC, -len(g[1]), g[0])):
+        # Split evenly (19 posts -> 7/6/6 rather than 8/8/3)
+        count = -(-len(members) // max_size)
+        size = -(-len(members) // count)
+        parts = [members[i:i + size] for i in range(0, len(members), size)]
+        for n, part in enumerate(parts, 1):
+            clusters.append((topic if len(parts) == 1 else f"{topic} ({n}/{len(parts)})", part))
+    return clusters
+
+
+def map_reduce_context(gemini, items, workers=4):
+    """
+    Map step of the weekly summary: summarize each topic cluster concurrently and
+    return the digests as the context for the final synthesis. A cluster whose
+    digest fails is passed through as its article list so no post is dropped.
+    """
+    clusters = cluster_items(items)
+    print(f"Map-reduce: {len(items)} posts in {len(clusters)} topic clusters (workers: {workers})")
+
+    def run(cluster):
+        topic, members = cluster
+        articles = build_context(members)
+        return topic, articles, gemini.summarize_weekly_cluster(topic, articles)
+
+    sections = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # map() keeps cluster order, so the synthesis input is stable across runs
+        for topic, articles, digest in executor.map(run, clusters):
+            if digest:
+                sections.append(f"【テーマ: {topic}】\n{digest}\n")
+            else:
+                print(f"Warning: Digest failed for '{topic}', using its article list instead.")
+                sections.append(f"【テーマ: {topic}】\n{articles}")
+    return "\n".join(sections)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate Weekly Summary Article")
     parser.add_argument("--dry-run", action="store_true", help="Dry run mode (no posting)")
     parser.add_argument("--days", type=int, default=7, help="Days to look back (default: 7)")
+    parser.add_argument("--full-text", action="store_true",
+                        help="Send the full text of the latest 20 posts instead of their stored structured summaries")
+    parser.add_argument("--mode", choices=["auto", "single", "map-reduce"], default="auto",
+                        help=f"single: one prompt with every post; map-reduce: digest topic clusters concurrently, then synthesize; "
+                             f"auto: map-reduce above {MAP_REDUCE_MIN_POSTS} posts or ~{MAP_REDUCE_MIN_TOKENS} tokens (default)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent cluster digests in map-reduce mode (default: 4)")
     args = parser.parse_args()
     
     print(f"=== Starting Weekly Summary Generation (Lookback: {args.days} days) ===")
@@ -51,7 +216,7 @@ def main():
     # 1. Initialize Clients
     try:
         wp = WordPressClient()
-        gemini = GeminiClient()
+        gemini = get_client()
         print("Clients initialized.")
     except Exception as e:
         print(f"Error initializing clients: {e}")
@@ -64,47 +229,34 @@ def main():
     
     print(f"Fetching posts published after: {start_date_iso}")
     
-    posts = wp.get_posts(limit=20, after=start_date_iso, status="publish") # Fetch enough posts
+    if args.full_text:
+        posts = wp.get_posts(limit=20, after=start_date_iso, status="publish") # Fetch enough posts
+        items = [full_text_item(post) for post in posts or []]
+    else:
+        items = collect_week_items(wp, start_date_iso)
     
-    if not posts:
+    if not items:
         print("No posts found in the last week. Exiting.")
         return
         
-    print(f"Found {len(posts)} posts.")
-    
-    # 3. Format Context for Gemini
-    context_summaries = []
-    for post in posts:
-        # Strip HTML from excerpt and content
-        title = post['title']['rendered']
-        link = post['link']
+    print(f"Found {len(items)} posts.")
+    for item in items:
+        print(f"- {item['title']}")
         
-        # Simple HTML strip (regex)
-        content_html = post['content']['rendered']
-        clean_content = re.sub('<[^<]+?>', '', content_html).strip()
-        # Reduce multiple newlines
-        clean_content = re.sub(r'\n\s*\n', '\n', clean_content)
-        
-        context_summaries.append({
-            "title": title,
-            "url": link,
-            "content": clean_content
-        })
-        print(f"- {title}")
-        
-    # Create context string
-    context_str = ""
-    for item in context_summaries:
-        context_str += f"""
-[Title] {item['title']}
-[URL] {item['url']}
-[Content] {item['content']}
--------------------
-"""
+    # 3. Format Context for Gemini
+    context_str = build_context(items)
+    context_tokens = estimate_tokens(context_str)
+    print(f"Weekly context: ~{context_tokens} tokens")
+    
+    map_reduce = args.mode == "map-reduce" or (
+        args.mode == "auto" and (len(items) > MAP_REDUCE_MIN_POSTS or context_tokens > MAP_REDUCE_MIN_TOKENS))
+    if map_reduce:
+        context_str = map_reduce_context(gemini, items, workers=args.workers)
+        print(f"Synthesis context: ~{estimate_tokens(context_str)} tokens")
 
     context_data = {
         "summary": context_str,
-        "key_facts": [f"Total articles: {len(posts)}", f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"]
+        "key_facts": [f"Total articles: {len(items)}", f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"]
     }
     
     # 4. Generate Content
@@ -125,7 +277,7 @@ def main():
     print(f"\nGenerated Title: {title}")
     
     # 5. SEO Optimization (Meta Description)
-    optimizer = SEOOptimizer()
+    optimizer = SEOOptimizer(client=gemini)
     meta_desc = optimizer.generate_meta_description(title, content, keyword)
     print(f"Meta Description: {meta_desc}")
     
@@ -151,6 +303,7 @@ def main():
 title: {title}
 date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 keyword: {keyword}
+type: weekly_summary
 ---
 
 {content}
@@ -176,13 +329,15 @@ keyword: {keyword}
     # Upload Image
     featured_media_id = None
     if generated_image_path and os.path.exists(generated_image_path):
-        print(f"Uploading hero image: {image_filename}")
-        media_result = wp.upload_media(generated_image_path, alt_text=title)
+        upload_path = prepare_for_upload(generated_image_path)
+        print(f"Uploading hero image: {os.path.basename(upload_path)}")
+        media_result = wp.upload_media(upload_path, alt_text=title)
         if media_result and 'id' in media_result:
             featured_media_id = media_result['id']
+            discard_source(generated_image_path, upload_path)
     
     # Convert Markdown to HTML
-    html_content = markdown.markdown(content, extensions=['extra', 'nl2br', 'tables'])
+    html_content = render_html(content, "article")
     
     # Create Post
     cat_id = None
@@ -208,6 +363,8 @@ keyword: {keyword}
     
     if result:
         print(f"Successfully posted: {result.get('link')}")
+        if result.get('id') and os.path.exists(markdown_path):
+            record_post_id(markdown_path, result['id'])
     else:
         print("Failed to post to WordPress.")
 
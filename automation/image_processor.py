@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Hero Image Post-processor for LogiShift
+
+Converts raw PNG hero images returned by Gemini into compressed, web-ready files:
+- WebP (always) and AVIF (optional, if the installed Pillow supports it)
+- Responsive width variants (e.g. 1200 / 768 / 480px), only when requested
+
+The primary WebP is what gets uploaded to WordPress; WordPress builds its own
+srcset sizes from it, so prepare_for_upload writes no variants, and callers
+remove the source PNG (discard_source) once the WebP has been uploaded. Variants
+are available from the CLI (--variants).
+"""
+
+import argparse
+import os
+import sys
+
+# Longest edge of the primary upload and the responsive variants (px)
+MAX_WIDTH = 1600
+VARIANT_WIDTHS = (1200, 768, 480)
+DEFAULT_QUALITY = 80
+# libwebp effort (0-6): 4 encodes ~2.5x faster than 6 for files only ~8% larger
+WEBP_METHOD = 4
+
+
+def _save(image, path, fmt, quality):
+    if fmt == "webp":
+        image.save(path, "WEBP", quality=quality, method=WEBP_METHOD)
+    elif fmt == "avif":
+        image.save(path, "AVIF", quality=quality)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    return path
+
+
+def _resize(image, width):
+    from PIL import Image
+    if image.width <= width:
+        return image
+    height = round(image.height * width / image.width)
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def process_hero_image(image_path, formats=("webp",), variant_widths=(),
+                       max_width=MAX_WIDTH, quality=DEFAULT_QUALITY, remove_original=False):
+    """
+    Create compressed and resized versions of a hero image.
+
+    Args:
+        image_path: Source image (usually *_hero.png)
+        formats: Output formats ("webp", "avif"); AVIF is skipped if unsupported
+        variant_widths: Widths for responsive variants (skipped if >= source width)
+        max_width: Longest width of the primary image
+        quality: Encoder quality (0-100)
+        remove_original: Delete the source file after a successful conversion
+
+    Returns:
+        dict: {"primary": path, "files": {fmt: {"full": path, width: path, ...}}}
+              or None if processing failed
+    """
+    # Imported here so the article scripts don't load Pillow at startup
+    from PIL import Image, features
+
+    formats = [f for f in formats if f != "avif" or features.check("avif")]
+    if not formats:
+        formats = ["webp"]
+
+    base, _ = os.path.splitext(image_path)
+    try:
+        with Image.open(image_path) as src:
+            image = src.convert("RGBA" if src.mode in ("RGBA", "LA", "P") else "RGB")
+
+        full = _resize(image, max_width)
+        files = {}
+        for fmt in formats:
+            files[fmt] = {"full": _save(full, f"{base}.{fmt}", fmt, quality)}
+            for width in variant_widths:
+                if width < full.width:
+                    files[fmt][width] = _save(_resize(full, width), f"{base}-{width}w.{fmt}", fmt, quality)
+    except Exception as e:
+        print(f"Warning: Image post-processing failed for {image_path}: {e}")
+        return None
+
+    primary = files[formats[0]]["full"]
+    before = os.path.getsize(image_path)
+    after = os.path.getsize(primary)
+    print(f"Optimized image: {os.path.basename(primary)} ({before // 1024} KB -> {after // 1024} KB)")
+
+    if remove_original and os.path.abspath(primary) != os.path.abspath(image_path):
+        os.remove(image_path)
+
+    return {"primary": primary, "files": files}
+
+
+def prepare_for_upload(image_path, **kwargs):
+    """
+    Process an image and return the path to upload (falls back to the original).
+    Only the primary WebP is written. The source PNG is kept until the upload has
+    succeeded; then call discard_source so each article keeps a single image.
+    """
+    base, _ = os.path.splitext(image_path)
+    if not os.path.exists(image_path) and os.path.exists(f"{base}.webp"):
+        # Already converted and uploaded on a previous run
+        return f"{base}.webp"
+    result = process_hero_image(image_path, **kwargs)
+    return result["primary"] if result else image_path
+
+
+def discard_source(image_path, upload_path):
+    """Delete the source image after its converted copy (upload_path) was uploaded."""
+    if os.path.abspath(upload_path) != os.path.abspath(image_path) and os.path.exists(image_path):
+        try:
+            os.remove(image_path)
+        except OSError as e:
+            print(f"Warning: Failed to remove {image_path}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert hero PNGs to WebP/AVIF with responsive variants.")
+    parser.add_argument("paths", nargs="*", help="Image files (default: all *_hero.png in generated_articles/)")
+    parser.add_argument("--avif", action="store_true", help="Also write AVIF files")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY, help="Encoder quality (default: 80)")
+    parser.add_argument("--variants", action="store_true",
+                        help=f"Also write responsive variants ({'/'.join(str(w) for w in VARIANT_WIDTHS)}px)")
+    parser.add_argument("--remove-original", action="store_true", help="Delete source PNGs after conversion")
+    args = parser.parse_args()
+
+    paths = args.paths
+    if not paths:
+        output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated_articles")
+        paths = sorted(os.path.join(output_dir, f) for f in os.listdir(output_dir) if f.endswith("_hero.png"))
+
+    formats = ("webp", "avif") if args.avif else ("webp",)
+    failed = 0
+    for path in paths:
+        if process_hero_image(path, formats=formats, quality=args.quality, remove_original=args.remove_original,
+                              variant_widths=VARIANT_WIDTHS if args.variants else ()) is None:
+            failed += 1
+
+    print(f"\nProcessed {len(paths) - failed}/{len(paths)} image(s).")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
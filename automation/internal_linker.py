@@ -125,7 +125,7 @@ class InternalLinkSuggester:
         """
 
         try:
-            response = self.gemini.generate_content(prompt)
+            response = self.gemini.generate_content(prompt, task="internal_links")
             if not response or not response.text:
                 print("No response from Gemini for relevance scoring.")
                 return []
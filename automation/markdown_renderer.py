@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Shared Markdown Renderer for LogiShift
+
+One place for Markdown -> HTML conversion and the cleanup applied around it:
+- Each profile (extension list) is configured once; a Markdown instance is built
+  per profile and thread and reused (reset() between documents) instead of
+  re-loading extensions on every markdown.markdown() call
+- The cleanup of stray HTML in generated Markdown (<br> -> space, other tags
+  removed) runs as a single precompiled regex pass
+
+Profiles:
+- article: generated articles and weekly summaries
+- static_page: privacy policy / about / contact pages
+- cluster: pillar cluster articles
+
+Benchmark (bulk re-render of generated_articles/):
+    python automation/benchmark.py --scenario render
+"""
+
+import re
+import threading
+
+# Extension lists per output type (output must stay identical to the previous per-call setup)
+PROFILES = {
+    "article": ("extra", "nl2br", "tables"),
+    "static_page": ("extra", "nl2br", "sane_lists"),
+    "cluster": ("tables", "fenced_code"),
+}
+
+# <br> variants become a space, any other tag is dropped (one pass)
+_CLEANUP_RE = re.compile(r"(<br\s*/?>\s*)|<[^>]+>")
+_TAG_RE = re.compile(r"<[^<]+?>")
+_FRONTMATTER_RE = re.compile(r"^---\n(.*?)\n---", re.DOTALL)
+
+# Markdown instances are not thread-safe, so each thread keeps its own per profile
+_local = threading.local()
+
+
+def _converter(profile):
+    converters = getattr(_local, "converters", None)
+    if converters is None:
+        converters = _local.converters = {}
+    md = converters.get(profile)
+    if md is None:
+        # Imported here to keep CLI startup fast
+        import markdown
+        md = converters[profile] = markdown.Markdown(extensions=list(PROFILES[profile]))
+    return md
+
+
+def render_html(text, profile="article"):
+    """Convert Markdown to HTML with the profile's extensions."""
+    md = _converter(profile)
+    try:
+        return md.convert(text)
+    finally:
+        md.reset()
+
+
+def clean_markdown(text):
+    """Remove HTML tags from generated Markdown, turning <br> into spaces."""
+    return _CLEANUP_RE.sub(lambda m: " " if m.group(1) else "", text)
+
+
+def strip_tags(html):
+    """Plain text of an HTML fragment (tags removed, entities kept)."""
+    return _TAG_RE.sub("", html)
+
+
+def split_frontmatter(text):
+    """Return (frontmatter text or None, body) of a Markdown document."""
+    match = _FRONTMATTER_RE.match(text)
+    if not match:
+        return None, text
+    return match.group(1), text[match.end():].strip()
+
+
+def parse_frontmatter(frontmatter):
+    """Simple `key: value` lines of a frontmatter block as a dict."""
+    fields = {}
+    for line in (frontmatter or "").splitlines():
+        key, sep, value = line.partition(":")
+        if sep and key.strip() and not line.startswith((" ", "\t", "-")):
+            fields[key.strip()] = value.strip().strip('"\'')
+    return fields
+
+
+def set_frontmatter_fields(path, fields):
+    """Set (add or replace) `key: value` lines in the frontmatter of a local Markdown copy."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        frontmatter, body = split_frontmatter(text)
+        if frontmatter is None:
+            return
+        prefixes = tuple(f"{key}:" for key in fields)
+        lines = [line for line in frontmatter.splitlines() if not line.startswith(prefixes)]
+        lines.extend(f"{key}: {value}" for key, value in fields.items())
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("---\n" + "\n".join(lines) + f"\n---\n\n{body}\n")
+    except OSError as e:
+        print(f"Warning: Failed to update frontmatter of {path}: {e}")
+
+
+def record_post_id(path, post_id):
+    """
+    Store the WordPress post ID in the frontmatter of a local Markdown copy, so
+    republish.py can match it to the live post without guessing.
+    """
+    set_frontmatter_fields(path, {"post_id": post_id})
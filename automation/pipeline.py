@@ -56,6 +56,8 @@ def main():
     parser.add_argument("--limit", type=int, default=2, help="Max articles to generate per run")
     parser.add_argument("--score-limit", type=int, default=0, help="Max articles to score (0 for all)")
     parser.add_argument("--dry-run", action="store_true", help="Dry run mode (no posting)")
+    parser.add_argument("--no-prefilter", action="store_true", help="Send all collected articles to LLM scoring")
+    parser.add_argument("--prefilter-min-prob", type=float, default=0.15, help="Local pre-filter drop threshold (0-1)")
     
     args = parser.parse_args()
     
@@ -69,12 +71,17 @@ def main():
     # Import modules directly
     sys.path.append(os.path.dirname(base_dir))
     from automation.collector import fetch_rss, DEFAULT_SOURCES
-    from automation.scorer import score_article, score_articles_batch
+    from automation.scorer import score_articles_batch, plan_scoring_batches, scoring_batch_cap
+    from automation.prefilter import PreFilter, append_history
     from automation.url_reader import extract_content
     from automation.summarizer import summarize_article
     from automation.classifier import ArticleClassifier
     from automation.wp_client import WordPressClient
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client
+    from automation.tracing import tracer, stage
+
+    # Per-stage timing/token records are written to automation/traces/<run_id>.jsonl
+    tracer.start_run()
     
     collected_articles = []
     
@@ -98,10 +105,11 @@ def main():
     random.shuffle(source_items)
     print("Source order shuffled.")
 
-    for name, url in source_items:
-        # fetch_rss accepts both, prioritizes hours if set not None
-        fetched = fetch_rss(url, name, days=lookback_days, hours=lookback_hours)
-        collected_articles.extend(fetched)
+    with stage("collection"):
+        for name, url in source_items:
+            # fetch_rss accepts both, prioritizes hours if set not None
+            fetched = fetch_rss(url, name, days=lookback_days, hours=lookback_hours)
+            collected_articles.extend(fetched)
         
     print(f"Collected {len(collected_articles)} articles.")
     
@@ -110,18 +118,26 @@ def main():
     scored_articles = []
     
     articles_to_score = collected_articles
+
+    # Drop obvious off-topic articles locally before spending Gemini calls on them
+    if not args.no_prefilter:
+        with stage("prefilter"):
+            prefilter = PreFilter()
+            articles_to_score, dropped = prefilter.filter(articles_to_score, min_probability=args.prefilter_min_prob)
+        model_note = "trained model" if prefilter.trained else "default weights"
+        print(f"Pre-filter ({model_note}): kept {len(articles_to_score)}, dropped {len(dropped)}.")
+        for a in dropped:
+            print(f"  - Dropped ({a['prefilter_probability']:.2f}): {a.get('title', 'Unknown')[:50]}")
+
     if args.score_limit > 0:
         print(f"Limiting scoring to first {args.score_limit} articles.")
-        articles_to_score = collected_articles[:args.score_limit]
+        articles_to_score = articles_to_score[:args.score_limit]
     
     
     # Initialize Gemini Client once
-    gemini_client = GeminiClient()
+    gemini_client = get_client()
     
     import time
-    batch_size = 10
-    print(f"Scoring in batches of {batch_size}...")
-    
     # Early Exit Logic
     high_score_count = 0
     early_exit_threshold = int(args.limit * 2) # Updated to 2x buffer
@@ -131,30 +147,30 @@ def main():
     
     print(f"Early Exit Threshold configured: Stop if {early_exit_threshold} high-score articles found.")
 
-    for i in range(0, len(articles_to_score), batch_size):
-        batch = articles_to_score[i:i + batch_size]
-        print(f"[{i+1}-{min(i+batch_size, len(articles_to_score))}/{len(articles_to_score)}] Processing batch...")
+    # Batch size adapts to summary lengths and the scoring model's token limits, capped so
+    # the early-exit check (between batches) is not too coarse
+    batches = plan_scoring_batches(articles_to_score, max_batch_size=scoring_batch_cap(early_exit_threshold))
+    print(f"Scoring in {len(batches)} batch(es) (sizes: {[len(b) for b in batches]})...")
+
+    i = 0
+    for batch in batches:
+        print(f"[{i+1}-{i+len(batch)}/{len(articles_to_score)}] Processing batch...")
         
         try:
-            batch_results = score_articles_batch(batch, client=gemini_client, start_id=i)
+            # score_articles_batch re-requests missing IDs itself, so no per-article fallback here
+            with stage("scoring"):
+                batch_results = score_articles_batch(batch, client=gemini_client, start_id=i)
             
-            if batch_results:
-                scored_articles.extend(batch_results)
-                 # Simple progress indication & Count High Scores
-                for res in batch_results:
-                     score = res.get('score', 0)
-                     print(f"  - Scored: {res.get('title', 'Unknown')[:40]}... -> {score} pts")
-                     if score >= args.threshold:
-                         high_score_count += 1
-            else:
-                print("Warning: Batch failed or returned no results. Falling back to individual scoring...")
-                for article in batch:
-                    print(f"  Fallback Scoring: {article['title'][:30]}...")
-                    # Pass client to score_article as well
-                    scored = score_article(article, client=gemini_client)
-                    scored_articles.append(scored)
-                    if scored.get('score', 0) >= args.threshold:
-                        high_score_count += 1
+            scored_articles.extend(batch_results)
+            # Simple progress indication & Count High Scores
+            for res in batch_results:
+                 score = res.get('score', 0)
+                 print(f"  - Scored: {res.get('title', 'Unknown')[:40]}... -> {score} pts")
+                 if score >= args.threshold:
+                     high_score_count += 1
+
+            if len(batch_results) < len(batch):
+                print(f"Warning: {len(batch) - len(batch_results)} article(s) in this batch could not be scored.")
             
             # Check for Early Exit
             if high_score_count >= early_exit_threshold:
@@ -163,12 +179,28 @@ def main():
                 
         except Exception as e:
             print(f"Error processing batch: {e}")
-                
+
+        i += len(batch)
         time.sleep(2) # Rate limit protection
         
     # Filter
     high_score_articles = [a for a in scored_articles if a["score"] >= args.threshold]
     high_score_articles.sort(key=lambda x: x["score"], reverse=True)
+
+    # Save scores (also kept as training data for the local pre-filter)
+    try:
+        with open(scored_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "threshold": args.threshold,
+                "total": len(scored_articles),
+                "high_score_count": len(high_score_articles),
+                "articles": scored_articles
+            }, f, indent=2, ensure_ascii=False)
+    except Exception as e:
+        print(f"Warning: Failed to save scored articles: {e}")
+    if not args.dry_run:
+        # Training data for the pre-filter; dry runs (tests, benchmarks) must not grow it
+        append_history(scored_articles)
     
     print(f"\nFound {len(high_score_articles)} articles above threshold {args.threshold}.")
     
@@ -177,6 +209,7 @@ def main():
     
     if not high_score_articles:
         print("No articles to generate. Exiting.")
+        tracer.print_summary()
         return
 
     count = 0
@@ -222,7 +255,8 @@ def main():
         # Combine existing WP titles and locally processed titles
         comparison_pool = existing_titles + generated_titles_this_run
         
-        duplicate_of = gemini_client.check_duplication(article['title'], article.get('summary', ''), comparison_pool)
+        with stage("dedup_check", article=article['title']):
+            duplicate_of = gemini_client.check_duplication(article['title'], article.get('summary', ''), comparison_pool)
         
         if duplicate_of:
             print(f"SKIP: Duplicate detected! '{article['title']}' is a duplicate of '{duplicate_of}'")
@@ -234,8 +268,10 @@ def main():
         
         # Determine Type
         source = article.get("source", "")
-        # Use dynamic classification
-        article_type = classifier.classify_type(article['title'], article['summary'], source)
+        # Type, category and tags in one call; the result is reused by generate_article_flow
+        with stage("classification", article=article['title']):
+            classification = classifier.classify(article['title'], article['summary'], source)
+        article_type = classification["article_type"]
         print(f"Type: {article_type}")
         
         # Generate keyword
@@ -250,15 +286,17 @@ def main():
             
             try:
                 # Step 2.5-A: URL reading and summarization
-                article_content = extract_content(article['url'], article['source'])
+                with stage("url_read", article=article['title']):
+                    article_content = extract_content(article['url'], article['source'])
                 
                 if article_content['content'] and "Error" not in article_content['title']:
                     # Pass gemini_client to summarizer
-                    summary_data = summarize_article(
-                        article_content['content'], 
-                        article['title'],
-                        client=gemini_client
-                    )
+                    with stage("context_summary", article=article['title']):
+                        summary_data = summarize_article(
+                            article_content['content'], 
+                            article['title'],
+                            client=gemini_client
+                        )
                     
                     # Pass context as JSON string or Dict (generate_article_flow handles both, but let's pass context_json string to stay consistent with args, or dict)
                     # The flow function handles both.
@@ -283,12 +321,15 @@ def main():
             schedule=None,
             context=context_json,
             gemini_client=gemini_client,
-            wp_client=wp_client
+            wp_client=wp_client,
+            classification=classification
         )
         
         if success:
             count += 1
         print("-" * 40)
 
+    tracer.print_summary()
+
 if __name__ == "__main__":
     main()
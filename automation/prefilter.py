@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Local Relevance Pre-filter for LogiShift
+
+Drops obviously off-topic articles before they are sent to Gemini for scoring.
+Scoring is fully local:
+- Logistics keyword lexicon (Japanese / English)
+- Per-source priors
+- A small logistic regression model trained on historical scorer outputs
+
+Without a trained model the lexicon weights and source priors are used as-is.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, "prefilter_model.json")
+DEFAULT_HISTORY_PATH = os.path.join(BASE_DIR, "scoring_history.jsonl")
+
+# Keyword -> weight (log-odds contribution). Japanese terms are matched as substrings,
+# English terms on word boundaries (case-insensitive).
+LEXICON_JA = {
+    "物流": 1.5, "ロジスティクス": 1.5, "倉庫": 1.5, "配送": 1.2, "運送": 1.2, "輸送": 1.2,
+    "トラック": 1.0, "ドライバー": 0.8, "荷主": 1.2, "3PL": 1.5, "WMS": 1.5, "TMS": 1.2,
+    "サプライチェーン": 1.5, "在庫": 1.0, "ピッキング": 1.5, "マテハン": 1.5, "自動倉庫": 1.5,
+    "AGV": 1.2, "AMR": 1.2, "フォークリフト": 1.2, "宅配": 1.0, "2024年問題": 1.5,
+    "港湾": 1.0, "海運": 1.0, "航空貨物": 1.2, "貨物": 1.0, "フルフィルメント": 1.2,
+    "ラストワンマイル": 1.2, "共同配送": 1.5, "パレット": 1.0, "通関": 1.0, "調達": 0.6,
+}
+LEXICON_EN = {
+    "logistics": 1.5, "warehouse": 1.5, "warehousing": 1.5, "supply chain": 1.5, "freight": 1.2,
+    "shipping": 0.8, "fulfillment": 1.2, "inventory": 1.0, "trucking": 1.2, "truckload": 1.2,
+    "carrier": 0.6, "3pl": 1.5, "wms": 1.5, "tms": 1.0, "last mile": 1.2, "last-mile": 1.2,
+    "delivery": 0.6, "port": 0.6, "cargo": 1.0, "forklift": 1.2, "pallet": 1.0,
+    "distribution center": 1.5, "parcel": 0.8, "robotics": 0.6, "amr": 0.8, "agv": 1.0,
+    "procurement": 0.6, "container": 0.6, "intermodal": 1.2, "drayage": 1.2,
+}
+
+# Per-source prior (log-odds). Broad tech feeds carry a lot of off-topic news.
+SOURCE_PRIORS = {
+    "techcrunch": -1.5,
+    "pandaily": -1.0,
+    "36kr_japan": -0.5,
+    "robot_report": -0.3,
+    "robotics_automation_news": -0.3,
+    "merkmal_biz": 0.0,
+    "wsj_logistics": 0.5,
+    "supply_chain_dive": 0.8,
+    "logistics_mgmt": 0.8,
+    "supply_chain_brain": 0.8,
+    "freightwaves": 0.5,
+    "the_loadstar": 0.8,
+    "logistics_manager_uk": 0.8,
+    "supply_chain_asia": 0.8,
+    "lnews": 1.0,
+    "logistics_today": 1.0,
+    "logi_biz": 1.0,
+    "weekly_net": 0.8,
+}
+
+# Drop threshold used by PreFilter.filter and the CLIs
+DEFAULT_MIN_PROBABILITY = 0.15
+
+# Untrained bias: with the default threshold an article from a neutral (0.0) or mildly
+# negative (-0.3) source needs at least one lexicon hit to pass:
+# sigmoid(-2.0) = 0.119 < 0.15, sigmoid(-2.0 + 0.6 - 0.3) = 0.154 >= 0.15 (weakest keyword).
+DEFAULT_BIAS = -2.0
+
+# Articles scoring at or above this LLM score count as positives when training.
+DEFAULT_LABEL_THRESHOLD = 60
+
+_EN_PATTERNS = {kw: re.compile(r"\b" + re.escape(kw) + r"\b") for kw in LEXICON_EN}
+_JA_CHARS = re.compile(r"[぀-ヿ一-鿿]")
+
+
+def extract_features(article):
+    """Return a sparse feature dict {name: value} for an article."""
+    title = article.get("title") or ""
+    summary = re.sub(r"<[^<]+?>", "", article.get("summary") or "")
+    text = f"{title}\n{summary}"
+    lowered = text.lower()
+
+    features = {}
+    hits = 0
+    for kw in LEXICON_JA:
+        if kw in text:
+            features[f"kw:{kw}"] = 1.0
+            hits += 1
+    for kw, pattern in _EN_PATTERNS.items():
+        if pattern.search(lowered):
+            features[f"kw:{kw}"] = 1.0
+            hits += 1
+    # Title hits are a stronger signal than summary hits
+    title_lower = title.lower()
+    if any(kw in title for kw in LEXICON_JA) or any(p.search(title_lower) for p in _EN_PATTERNS.values()):
+        features["title_hit"] = 1.0
+
+    features["hits"] = min(hits, 5) / 5.0
+    features[f"src:{article.get('source', '')}"] = 1.0
+    if _JA_CHARS.search(title):
+        features["lang:ja"] = 1.0
+    return features
+
+
+def default_weights():
+    """Hand-set weights used until a model is trained."""
+    weights = {"__bias__": DEFAULT_BIAS}
+    for kw, w in list(LEXICON_JA.items()) + list(LEXICON_EN.items()):
+        weights[f"kw:{kw}"] = w
+    for source, prior in SOURCE_PRIORS.items():
+        weights[f"src:{source}"] = prior
+    weights["title_hit"] = 0.5
+    return weights
+
+
+def _sigmoid(z):
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class PreFilter:
+    def __init__(self, weights=None, model_path=DEFAULT_MODEL_PATH):
+        """
+        Args:
+            weights: Explicit weight dict (overrides model_path)
+            model_path: Trained model JSON; falls back to default weights if missing
+        """
+        self.trained = False
+        if weights is not None:
+            self.weights = weights
+        else:
+            self.weights = default_weights()
+            if model_path and os.path.exists(model_path):
+                try:
+                    with open(model_path, 'r', encoding='utf-8') as f:
+                        self.weights = json.load(f)["weights"]
+                    self.trained = True
+                except Exception as e:
+                    print(f"Warning: Failed to load pre-filter model ({e}). Using default weights.")
+
+    def probability(self, article):
+        """Estimated probability (0-1) that the LLM would find the article relevant."""
+        z = self.weights.get("__bias__", 0.0)
+        for name, value in extract_features(article).items():
+            z += self.weights.get(name, 0.0) * value
+        return _sigmoid(z)
+
+    def filter(self, articles, min_probability=DEFAULT_MIN_PROBABILITY):
+        """
+        Split articles into (kept, dropped). Only clear rejects are dropped;
+        anything borderline is left for the LLM scorer.
+        """
+        kept, dropped = [], []
+        for article in articles:
+            p = self.probability(article)
+            if p < min_probability:
+                dropped.append({**article, "prefilter_probability": round(p, 3)})
+            else:
+                kept.append(article)
+        return kept, dropped
+
+
+def load_scored_records(paths):
+    """
+    Load scored articles from scorer/pipeline outputs.
+    Accepts JSONL history files, scorer.py output ({"articles": [...]}) or plain lists.
+    """
+    records = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if path.endswith(".jsonl"):
+                    rows = [json.loads(line) for line in f if line.strip()]
+                else:
+                    data = json.load(f)
+                    rows = data.get("articles", []) if isinstance(data, dict) else data
+        except Exception as e:
+            print(f"Warning: Failed to load {path}: {e}", file=sys.stderr)
+            continue
+        for row in rows:
+            if isinstance(row, dict) and row.get("relevance") != "error" and isinstance(row.get("score"), (int, float)):
+                records.append(row)
+    return records
+
+
+def append_history(scored_articles, path=DEFAULT_HISTORY_PATH):
+    """Append scored articles to the local JSONL history used for training."""
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            for a in scored_articles:
+                row = {k: a.get(k) for k in ("title", "summary", "source", "url", "score", "relevance")}
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"Warning: Failed to append scoring history: {e}")
+
+
+def train(records, label_threshold=DEFAULT_LABEL_THRESHOLD, epochs=30, learning_rate=0.1, l2=0.001, seed=0):
+    """
+    Fit logistic regression weights with SGD, starting from the default weights.
+    Labels are 1 for LLM score >= label_threshold.
+    """
+    weights = default_weights()
+    samples = [(extract_features(r), 1.0 if r["score"] >= label_threshold else 0.0) for r in records]
+    if not samples:
+        return weights
+
+    rng = random.Random(seed)
+    for _ in range(epochs):
+        rng.shuffle(samples)
+        for features, label in samples:
+            z = weights.get("__bias__", 0.0) + sum(weights.get(n, 0.0) * v for n, v in features.items())
+            error = _sigmoid(z) - label
+            weights["__bias__"] = weights.get("__bias__", 0.0) - learning_rate * error
+            for name, value in features.items():
+                w = weights.get(name, 0.0)
+                weights[name] = w - learning_rate * (error * value + l2 * w)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or apply the local relevance pre-filter.")
+    parser.add_argument("--train", nargs="+", metavar="FILE", help="Scored article files (JSON/JSONL) to train on")
+    parser.add_argument("--input", type=str, help="Collected articles JSON to filter (prints kept/dropped)")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL_PATH, help="Model path")
+    parser.add_argument("--label-threshold", type=int, default=DEFAULT_LABEL_THRESHOLD, help="LLM score counted as relevant")
+    parser.add_argument("--min-probability", type=float, default=DEFAULT_MIN_PROBABILITY, help="Drop articles below this probability")
+    args = parser.parse_args()
+
+    if args.train:
+        records = load_scored_records(args.train)
+        positives = sum(1 for r in records if r["score"] >= args.label_threshold)
+        print(f"Training on {len(records)} records ({positives} positive)...")
+        weights = train(records, label_threshold=args.label_threshold)
+
+        # Report how the trained model would have treated the training data
+        pf = PreFilter(weights=weights)
+        _, dropped = pf.filter(records, args.min_probability)
+        lost = sum(1 for r in dropped if r["score"] >= args.label_threshold)
+        print(f"Would drop {len(dropped)}/{len(records)} (of which {lost} relevant).")
+
+        with open(args.model, 'w', encoding='utf-8') as f:
+            json.dump({"label_threshold": args.label_threshold, "samples": len(records), "weights": weights}, f, ensure_ascii=False, indent=2)
+        print(f"Model saved to: {args.model}")
+
+    if args.input:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            articles = json.load(f)
+        kept, dropped = PreFilter(model_path=args.model).filter(articles, args.min_probability)
+        print(f"Kept {len(kept)}, dropped {len(dropped)}.")
+        for a in dropped:
+            print(f"  [drop {a['prefilter_probability']:.2f}] ({a.get('source')}) {a.get('title', '')[:60]}")
+
+    if not args.train and not args.input:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Prompt Template Registry for LogiShift
+
+Prompt templates are dedented and compiled once, at import time of the module
+that registers them, instead of rebuilding large f-strings on every call:
+- Templates use str.format syntax with plain field names ({title}); literal
+  braces are written as {{ and }}
+- render() fills in only the selected template
+- estimate() returns the token estimate of a rendered prompt without building
+  it, so callers (e.g. batch planning) can budget requests up front
+
+Usage: python automation/prompt_templates.py lists all registered templates
+with their fixed token cost.
+"""
+
+import importlib
+import string
+import textwrap
+
+
+def estimate_tokens(text):
+    """
+    Rough token estimate without calling the API.
+    Japanese/CJK characters are counted as ~1 token each, other text as ~4 chars per token.
+    """
+    if not text:
+        return 0
+    text = str(text)
+    wide = sum(1 for ch in text if ord(ch) > 0x2E7F)
+    narrow = len(text) - wide
+    return wide + (narrow + 3) // 4
+
+
+class PromptTemplate:
+    def __init__(self, name, source):
+        self.name = name
+        self.text = textwrap.dedent(source)
+        # Compiled form: alternating literal chunks and field names
+        self._parts = []
+        self.fields = []
+        for literal, field, spec, conversion in string.Formatter().parse(self.text):
+            if literal:
+                self._parts.append((literal, None))
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"Prompt template '{name}': only plain {{name}} fields are supported, got {{{field}}}")
+            self._parts.append((None, field))
+            if field not in self.fields:
+                self.fields.append(field)
+        # Tokens of the fixed text (what every rendered prompt costs before any values)
+        self.static_tokens = sum(estimate_tokens(literal) for literal, _ in self._parts if literal)
+
+    def render(self, **values):
+        missing = [f for f in self.fields if f not in values]
+        if missing:
+            raise KeyError(f"Prompt template '{self.name}' is missing values for: {', '.join(missing)}")
+        return "".join(literal if field is None else str(values[field]) for literal, field in self._parts)
+
+    def estimate(self, **values):
+        """Token estimate of render(**values)."""
+        return self.static_tokens + sum(estimate_tokens(values.get(f, "")) for f in self.fields)
+
+
+_registry = {}
+
+
+def register(name, source):
+    """
+    Compile a template and add it to the registry. Registering the same name again
+    with identical text returns the existing template (a module imported both as
+    `automation.x` and as `x` runs its registrations twice); different text for
+    an existing name is an error.
+    """
+    template = PromptTemplate(name, source)
+    existing = _registry.get(name)
+    if existing is not None:
+        if existing.text != template.text:
+            raise ValueError(f"Prompt template '{name}' is already registered with different text")
+        return existing
+    _registry[name] = template
+    return template
+
+
+def get(name):
+    return _registry[name]
+
+
+def render(name, **values):
+    return _registry[name].render(**values)
+
+
+def templates():
+    return dict(_registry)
+
+
+# Modules whose import registers templates
+TEMPLATE_MODULES = ("gemini_client", "classifier", "scorer")
+
+
+def main():
+    # Templates are registered in the importable module, not in __main__
+    try:
+        registry = importlib.import_module("automation.prompt_templates")
+        package = "automation."
+    except ImportError:
+        registry = importlib.import_module("prompt_templates")
+        package = ""
+    for module in TEMPLATE_MODULES:
+        importlib.import_module(package + module)
+
+    print(f"{'Template':<32}{'Fields':<48}{'Static tok':>11}")
+    for name, template in sorted(registry.templates().items()):
+        print(f"{name:<32}{', '.join(template.fields)[:47]:<48}{template.static_tokens:>11}")
+
+
+if __name__ == "__main__":
+    main()
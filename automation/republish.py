@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Bulk Re-render and Republish for LogiShift
+
+Re-renders every local Markdown copy in generated_articles/ with the current
+markdown_renderer rules, compares the HTML with the live WordPress post and
+updates only the posts whose content changed. No Gemini calls are made, so
+site-wide formatting fixes only cost WordPress requests.
+
+Matching local files to live posts:
+1. `post_id` in the frontmatter (written by generate_article / generate_weekly_summary)
+2. The post title (frontmatter title, or the cluster article config title)
+3. The opening text of the article found in a live post
+Matched IDs are written back to the frontmatter (except with --dry-run). A title or
+text that fits several live posts, and a post matched by several local files, is
+reported and left alone.
+
+Posts edited on WordPress after the local copy was written (or last republished)
+are reported and not overwritten unless --force is given.
+
+Usage:
+    python automation/republish.py --dry-run --show-diff
+    python automation/republish.py --workers 8
+"""
+
+import argparse
+import difflib
+import html
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from automation.wp_client import WordPressClient
+    from automation.markdown_renderer import (render_html, clean_markdown, strip_tags, split_frontmatter,
+                                              parse_frontmatter, record_post_id, set_frontmatter_fields)
+except ImportError:
+    from wp_client import WordPressClient
+    from markdown_renderer import (render_html, clean_markdown, strip_tags, split_frontmatter,
+                                   parse_frontmatter, record_post_id, set_frontmatter_fields)
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated_articles")
+
+# <date>_weekly_summary.md (files written before the `type` frontmatter key existed)
+WEEKLY_SUMMARY_SUFFIX = "_weekly_summary.md"
+
+LIVE_FIELDS = ["id", "title", "content", "link", "modified_gmt"]
+LIVE_STATUSES = "publish,future,draft"
+
+# Characters of the article's opening text used to recognise it in live posts
+FINGERPRINT_CHARS = 80
+
+# A post is created a few minutes after its local copy is saved (image generation,
+# uploads); modifications within this window are not treated as manual edits
+EDIT_GRACE = timedelta(hours=1)
+
+_WS_RE = re.compile(r"\s+")
+_BETWEEN_TAGS_RE = re.compile(r">\s+<")
+_LOCAL_IMAGE_RE = re.compile(r"!\[[^\]]*\]\((?!https?://)[^)]+\)")
+
+
+def normalize_html(text):
+    """Whitespace-insensitive form of post HTML for comparison."""
+    return _WS_RE.sub(" ", _BETWEEN_TAGS_RE.sub("><", text)).strip()
+
+
+def fingerprint(text):
+    return _WS_RE.sub("", html.unescape(strip_tags(text)))
+
+
+def parse_local_time(value):
+    """Frontmatter `date` (local time of the machine that wrote it) as an aware UTC datetime."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").astimezone(timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_gmt(value):
+    """WordPress `*_gmt` timestamp (also stored as `republished`) as an aware UTC datetime."""
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def cluster_titles():
+    """{file stem suffix: title} of the configured cluster articles (rendered with the cluster profile)."""
+    try:
+        from automation.generate_cluster_article import CONFIGS
+    except ImportError:
+        from generate_cluster_article import CONFIGS
+    return {key: config["title"] for key, config in CONFIGS.items()}
+
+
+def load_local_articles(directory, only=None):
+    """
+    Read and re-render the local Markdown copies, each with the pipeline it was
+    published with (cluster, weekly summary or generated article).
+    """
+    clusters = cluster_titles()
+    articles = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".md") or (only and only not in name):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, "r", encoding="utf-8") as f:
+            frontmatter, body = split_frontmatter(f.read())
+        fields = parse_frontmatter(frontmatter)
+        # <date>_<target>.md for cluster articles (see generate_cluster_article)
+        cluster_key = name[len("YYYY-MM-DD_"):-len(".md")]
+        if cluster_key in clusters:
+            profile = "cluster"
+            html_content = render_html(body, "cluster")
+            fields.setdefault("title", clusters[cluster_key])
+        elif fields.get("type") == "weekly_summary" or name.endswith(WEEKLY_SUMMARY_SUFFIX):
+            # generate_weekly_summary publishes its Markdown as-is (no clean_markdown pass)
+            profile = "weekly_summary"
+            html_content = render_html(body, "article")
+        else:
+            profile = "article"
+            html_content = render_html(clean_markdown(body), "article")
+        post_id = fields.get("post_id")
+        # Live modifications after this point were not made by the pipeline
+        synced = [t for t in (parse_local_time(fields.get("date")), parse_gmt(fields.get("republished"))) if t]
+        articles.append({
+            "path": path,
+            "name": name,
+            "title": fields.get("title", ""),
+            "post_id": int(post_id) if post_id and post_id.isdigit() else None,
+            "profile": profile,
+            "html": html_content,
+            "local_images": bool(_LOCAL_IMAGE_RE.search(body)),
+            "synced_at": max(synced) if synced else None,
+        })
+    return articles
+
+
+def fetch_live_posts(wp):
+    """Every post with its raw content, keyed by ID (paged, 100 per request)."""
+    posts = {}
+    for post in wp.iter_posts(status=LIVE_STATUSES, fields=LIVE_FIELDS):
+        content = post.get("content") or {}
+        title = post.get("title") or {}
+        posts[post["id"]] = {
+            "id": post["id"],
+            "title": html.unescape(title.get("raw") or title.get("rendered") or "").strip(),
+            "content": content.get("raw") if content.get("raw") is not None else content.get("rendered", ""),
+            "link": post.get("link"),
+            "modified": parse_gmt(post.get("modified_gmt")),
+        }
+    return posts
+
+
+def match_posts(articles, live):
+    """
+    Attach the live post to each local article (None if not found). Ambiguous
+    matches are refused: the article gets `live` None and a `conflict` message.
+    """
+    by_title = {}
+    for post in live.values():
+        by_title.setdefault(post["title"], []).append(post)
+    live_text = None
+    for article in articles:
+        article["conflict"] = None
+        post = live.get(article["post_id"]) if article["post_id"] else None
+        article["matched_by"] = "post_id" if post else None
+        candidates = []
+        if post is None and article["title"]:
+            candidates = by_title.get(article["title"].strip(), [])
+            article["matched_by"] = "title"
+        if post is None and not candidates:
+            if live_text is None:
+                live_text = [(fingerprint(p["content"]), p) for p in live.values()]
+            opening = fingerprint(article["html"])[:FINGERPRINT_CHARS]
+            candidates = [p for text, p in live_text if opening and opening in text]
+            article["matched_by"] = "text"
+        if post is None and len(candidates) > 1:
+            ids = ", ".join(str(p["id"]) for p in candidates)
+            article["conflict"] = f"{article['matched_by']} matches several posts ({ids})"
+        elif post is None and candidates:
+            post = candidates[0]
+        article["live"] = post
+
+    # One post per local file: an explicit post_id wins, otherwise the match is refused
+    by_post = {}
+    for article in articles:
+        if article["live"]:
+            by_post.setdefault(article["live"]["id"], []).append(article)
+    for post_id, matched in by_post.items():
+        if len(matched) < 2:
+            continue
+        explicit = [a for a in matched if a["matched_by"] == "post_id"]
+        keep = explicit[0] if len(explicit) == 1 else None
+        names = ", ".join(a["name"] for a in matched)
+        for article in matched:
+            if article is not keep:
+                article["live"] = None
+                article["conflict"] = f"post {post_id} is matched by several files ({names})"
+    return articles
+
+
+def show_diff(article, limit=40):
+    old = _BETWEEN_TAGS_RE.sub(">\n<", article["live"]["content"].strip()).splitlines()
+    new = _BETWEEN_TAGS_RE.sub(">\n<", article["html"].strip()).splitlines()
+    lines = list(difflib.unified_diff(old, new, "live", "rendered", lineterm="", n=1))
+    for line in lines[:limit]:
+        print(f"    {line}")
+    if len(lines) > limit:
+        print(f"    ... ({len(lines) - limit} more diff lines)")
+
+
+def republish(wp, articles, workers=4, dry_run=False, diff=False, force=False):
+    """
+    Push the re-rendered HTML of changed articles. Posts edited on WordPress after
+    the local copy was synced are left alone unless force is set. Returns a dict of
+    counts: unchanged, changed, updated, failed, unmatched, conflicts, edited, skipped.
+    """
+    counts = {"unchanged": 0, "changed": 0, "updated": 0, "failed": 0, "unmatched": 0, "conflicts": 0,
+              "edited": 0, "skipped": 0}
+    changed = []
+    for article in articles:
+        post = article["live"]
+        if article["conflict"]:
+            counts["conflicts"] += 1
+            print(f"! {article['name']}: {article['conflict']}, skipped")
+            continue
+        if post is None:
+            counts["unmatched"] += 1
+            print(f"? {article['name']}: no matching live post")
+            continue
+        if article["local_images"]:
+            # Image paths were replaced with uploaded URLs at publish time; re-rendering would break them
+            counts["skipped"] += 1
+            print(f"- {article['name']}: references local images, skipped")
+            continue
+        if normalize_html(article["html"]) == normalize_html(post["content"]):
+            counts["unchanged"] += 1
+            continue
+        if (not force and post["modified"] and article["synced_at"]
+                and post["modified"] > article["synced_at"] + EDIT_GRACE):
+            counts["edited"] += 1
+            print(f"! {article['name']}: post {post['id']} was edited on WordPress "
+                  f"({post['modified']:%Y-%m-%d %H:%M} UTC) after the local copy, skipped (--force to overwrite)")
+            continue
+        counts["changed"] += 1
+        changed.append(article)
+        print(f"* {article['name']} -> post {post['id']} ({post['link']})")
+        if diff:
+            show_diff(article)
+
+    if dry_run or not changed:
+        return counts
+
+    def push(article):
+        result = wp.update_post(article["live"]["id"], content=article["html"])
+        if result and result.get("modified_gmt"):
+            # Our own update moves `modified`; remember it so the next run does not see a manual edit
+            set_frontmatter_fields(article["path"], {"republished": result["modified_gmt"]})
+        return article, result is not None
+
+    # Updates share the client's pooled keep-alive connections
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for article, ok in executor.map(push, changed):
+            counts["updated" if ok else "failed"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-render local Markdown copies and update changed WordPress posts (no Gemini calls)")
+    parser.add_argument("--dir", default=DEFAULT_DIR, help="Directory of Markdown copies (default: generated_articles/)")
+    parser.add_argument("--only", help="Only process files whose name contains this text")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent WordPress updates (default: 4)")
+    parser.add_argument("--dry-run", action="store_true", help="Report changed posts without updating them")
+    parser.add_argument("--show-diff", action="store_true", help="Print a diff of live vs re-rendered HTML")
+    parser.add_argument("--force", action="store_true",
+                        help="Also overwrite posts edited on WordPress after the local copy was written")
+    args = parser.parse_args()
+
+    print("=== Republish: re-render local articles ===")
+    try:
+        wp = WordPressClient()
+    except Exception as e:
+        print(f"Error initializing WordPress client: {e}")
+        sys.exit(1)
+
+    articles = load_local_articles(args.dir, only=args.only)
+    print(f"Rendered {len(articles)} local articles.")
+    live = fetch_live_posts(wp)
+    print(f"Fetched {len(live)} live posts.")
+    match_posts(articles, live)
+
+    if not args.dry_run:
+        for article in articles:
+            if article["live"] and article["post_id"] != article["live"]["id"]:
+                record_post_id(article["path"], article["live"]["id"])
+
+    counts = republish(wp, articles, workers=args.workers, dry_run=args.dry_run, diff=args.show_diff,
+                       force=args.force)
+
+    print("\n=== Republish Complete ===")
+    print(f"Unchanged: {counts['unchanged']}")
+    print(f"Changed:   {counts['changed']}" + (" (dry run, not updated)" if args.dry_run else ""))
+    if not args.dry_run:
+        print(f"Updated:   {counts['updated']}")
+        print(f"Failed:    {counts['failed']}")
+    print(f"Unmatched: {counts['unmatched']}")
+    if counts["conflicts"]:
+        print(f"Conflicts: {counts['conflicts']} (ambiguous or duplicate matches)")
+    if counts["edited"]:
+        print(f"Edited:    {counts['edited']} (changed on WordPress, use --force to overwrite)")
+    if counts["skipped"]:
+        print(f"Skipped:   {counts['skipped']} (local image references)")
+
+
+if __name__ == "__main__":
+    main()
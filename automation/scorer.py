@@ -14,11 +14,13 @@ import os
 import sys
 from dotenv import load_dotenv
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client, get_model_limits, route_model, is_quota_error
+    from automation.prompt_templates import register
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client, get_model_limits, route_model, is_quota_error
+    from automation.prompt_templates import register
 
 # Editorial Persona and Scoring Criteria
 # Editorial Persona and Scoring Criteria
@@ -52,7 +54,7 @@ SHARED_CRITERIA = """あなたは物流業界のDXエバンジェリスト「Log
    - 市場トレンドや今後の展望に関する情報か？
 """
 
-SCORING_PROMPT = SHARED_CRITERIA + """
+SCORING_PROMPT = register("scoring_single", SHARED_CRITERIA + """
 【記事情報】
 タイトル: {title}
 要約: {summary}
@@ -65,9 +67,9 @@ SCORING_PROMPT = SHARED_CRITERIA + """
   "reasoning": "<評価理由をターゲット読者の視点で2-3文で簡潔に>",
   "relevance": "<high/medium/low>"
 }}
-"""
+""")
 
-BATCH_SCORING_PROMPT = SHARED_CRITERIA + """
+BATCH_SCORING_PROMPT = register("scoring_batch", SHARED_CRITERIA + """
 【記事リスト】
 {articles_text}
 
@@ -81,14 +83,73 @@ BATCH_SCORING_PROMPT = SHARED_CRITERIA + """
     "relevance": "<high/medium/low>"
   }}
 ]
-"""
+""")
+
+# One article entry in the batch list (local ID 0..N-1)
+BATCH_SCORING_ITEM = register("scoring_batch_item", """
+ID: {id}
+タイトル: {title}
+要約: {summary}
+ソース: {source}
+---
+""")
+
+# Batch sizing: output tokens per scored entry ({"id", "score", "reasoning", "relevance"}),
+# share of the output limit we plan to use (the rest is headroom for thinking tokens and
+# verbose answers), and an upper bound that keeps the model accurate on long lists.
+# With the current 65k-output models the token budgets allow ~160 articles per batch,
+# so MAX_BATCH_SIZE is the limit that actually applies; the budgets only bind for
+# smaller models (DEFAULT_MODEL_LIMITS) or unusually long summaries.
+OUTPUT_TOKENS_PER_ARTICLE = 200
+OUTPUT_BUDGET_RATIO = 0.5
+MAX_BATCH_SIZE = 40
+# Articles scored per expected high-score candidate (assumed; the pre-filter has already
+# dropped the unlikely ones). Sizes batches so the pipeline's early-exit check, which runs
+# between batches, does not score far more articles than needed.
+ARTICLES_PER_CANDIDATE = 5
 
-def score_article(article, model_name="gemini-3-flash-preview", client=None):
+def scoring_batch_cap(early_exit_threshold):
+    """Batch size cap for a run that stops after early_exit_threshold high-score articles."""
+    return max(1, min(MAX_BATCH_SIZE, early_exit_threshold * ARTICLES_PER_CANDIDATE))
+
+def plan_scoring_batches(articles, model_name=None, max_batch_size=MAX_BATCH_SIZE):
+    """
+    Split articles into batches packed as full as the model limits allow.
+
+    Each article costs its estimated prompt tokens (title, summary, source) on the
+    input side and OUTPUT_TOKENS_PER_ARTICLE on the output side; a batch is closed
+    when either budget or max_batch_size would be exceeded.
+    """
+    context_limit, output_limit = get_model_limits(model_name or route_model("scoring"))
+    input_budget = context_limit - BATCH_SCORING_PROMPT.static_tokens
+    output_budget = int(output_limit * OUTPUT_BUDGET_RATIO)
+
+    batches = []
+    current = []
+    input_used = 0
+    for article in articles:
+        cost = BATCH_SCORING_ITEM.estimate(**_batch_item_values(0, article))
+        full = (
+            len(current) >= max_batch_size
+            or input_used + cost > input_budget
+            or (len(current) + 1) * OUTPUT_TOKENS_PER_ARTICLE > output_budget
+        )
+        if current and full:
+            batches.append(current)
+            current = []
+            input_used = 0
+        current.append(article)
+        input_used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def score_article(article, model_name=None, client=None):
     """Score a single article using Gemini API."""
     
     if client is None:
         try:
-            client = GeminiClient()
+            client = get_client()
         except Exception as e:
             print(f"Error initializing GeminiClient: {e}", file=sys.stderr)
             return {
@@ -101,7 +162,7 @@ def score_article(article, model_name="gemini-3-flash-preview", client=None):
                 "relevance": "error"
             }
     
-    prompt = SCORING_PROMPT.format(
+    prompt = SCORING_PROMPT.render(
         title=article.get("title", ""),
         summary=article.get("summary", ""),
         source=article.get("source", "")
@@ -109,7 +170,7 @@ def score_article(article, model_name="gemini-3-flash-preview", client=None):
     
     try:
         # Use GeminiClient's generate_content which has retry logic
-        response = client.generate_content(prompt, model=model_name)
+        response = client.generate_content(prompt, model=model_name, task="scoring")
         
         if not response:
             raise Exception("No response from Gemini API")
@@ -146,81 +207,169 @@ def score_article(article, model_name="gemini-3-flash-preview", client=None):
             "relevance": "error"
         }
 
-def score_articles_batch(articles, model_name="gemini-3-flash-preview", client=None, start_id=0):
-    """Score a batch of articles using Gemini API."""
+def _batch_item_values(local_id, article):
+    return {"id": local_id, "title": article.get('title'), "summary": article.get('summary', 'なし'),
+            "source": article.get('source')}
+
+def _build_batch_prompt(articles):
+    """Build the batch scoring prompt using local IDs 0..N-1."""
+    # Using simple index 0..N for the batch prompt is usually safer for the LLM to understand.
+    articles_text = "".join(BATCH_SCORING_ITEM.render(**_batch_item_values(i, article)) for i, article in enumerate(articles))
+    return BATCH_SCORING_PROMPT.render(articles_text=articles_text)
+
+def _parse_batch_response(result_text, batch_len):
+    """
+    Parse a batch scoring response into {local_id: result}.
+    Entries with missing/invalid IDs or non-numeric scores are dropped so the
+    caller can re-request them.
+    """
+    result_text = result_text.strip()
+
+    # Extract JSON from markdown code blocks if present
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+
+    # Cleanup potential invalid JSON (sometimes ends with comma)
+    if result_text.endswith(","):
+        result_text = result_text[:-1]
+
+    try:
+        results = json.loads(result_text)
+    except json.JSONDecodeError:
+        # Truncated output: salvage the complete objects before the cut
+        cut = result_text.rfind("}")
+        if cut == -1:
+            return {}
+        try:
+            results = json.loads(result_text[:cut + 1].rstrip().rstrip(",") + "]")
+        except json.JSONDecodeError:
+            return {}
+
+    if not isinstance(results, list):
+        print(f"Error: Batch response is not a list: {results}", file=sys.stderr)
+        return {}
+
+    parsed = {}
+    for res in results:
+        if not isinstance(res, dict):
+            continue
+        idx = res.get('id')
+        score = res.get('score')
+        if isinstance(idx, bool) or not isinstance(idx, int) or not 0 <= idx < batch_len:
+            continue
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            continue
+        # Keep the first answer if the model repeats an ID
+        parsed.setdefault(idx, res)
+    return parsed
+
+def score_articles_batch(articles, model_name=None, client=None, start_id=0, max_attempts=2, max_requests=None):
+    """
+    Score a batch of articles using Gemini API.
+
+    Articles missing from a response (dropped, invalid ID or score) are re-batched
+    on their own. A subset that fails `max_attempts` times in a row without any
+    progress is bisected, so a single bad article cannot sink the whole batch.
+    Request errors (server errors, timeouts, blocked responses) count as failed
+    attempts; only quota exhaustion across the model chain stops scoring early.
+    Total requests are capped by `max_requests` (default: one per article, the
+    cost of scoring them individually).
+    Returns scored articles in input order; articles that could not be scored are omitted.
+    """
     if not articles:
         return []
 
     if client is None:
         try:
-            client = GeminiClient()
+            client = get_client()
         except Exception as e:
             print(f"Error initializing GeminiClient: {e}", file=sys.stderr)
             return []
 
-    articles_text = ""
-    for i, article in enumerate(articles):
-        # Assign a temporary ID for matching (relative to batch, but we could use start_id if needed for logging)
-        # Using simple index 0..N for the batch prompt is usually safer for the LLM to understand.
-        articles_text += f"\nID: {i}\nタイトル: {article.get('title')}\n要約: {article.get('summary', 'なし')}\nソース: {article.get('source')}\n---\n"
+    if max_requests is None:
+        max_requests = max(2, len(articles))
 
-    prompt = BATCH_SCORING_PROMPT.format(articles_text=articles_text)
+    scored = {}
+    # Work queue of (article indices, consecutive failures without progress)
+    pending = [(list(range(len(articles))), 0)]
+    calls = 0
 
-    try:
-        response = client.generate_content(prompt, model=model_name)
-        
-        if not response:
-            raise Exception("No response from Gemini API")
+    while pending:
+        if calls >= max_requests:
+            remaining = sum(len(indices) for indices, _ in pending)
+            print(f"Warning: Batch scoring request budget ({max_requests}) exhausted. {remaining} article(s) left unscored.", file=sys.stderr)
+            break
 
-        result_text = response.text.strip()
-        
-        # Extract JSON from markdown code blocks if present
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        # Cleanup potential invalid JSON (sometimes ends with comma)
-        if result_text.endswith(","):
-             result_text = result_text[:-1]
+        indices, failures = pending.pop(0)
+        subset = [articles[i] for i in indices]
+        calls += 1
 
-        results = json.loads(result_text)
-        
-        if not isinstance(results, list):
-            print(f"Error: Batch response is not a list: {results}", file=sys.stderr)
-            return []
+        try:
+            response = client.generate_content(_build_batch_prompt(subset), model=model_name, task="scoring", raise_errors=True)
+        except Exception as e:
+            if is_quota_error(e):
+                # GeminiClient already retried and fell back across the chain; re-splitting will not help.
+                remaining = sum(len(i) for i, _ in pending) + len(indices)
+                print(f"Error batch scoring: quota exhausted, {remaining} article(s) left unscored: {e}", file=sys.stderr)
+                break
+            # Server error, timeout, safety block...: count as a failed attempt (retried, then bisected)
+            print(f"Error batch scoring: {e}", file=sys.stderr)
+            response = None
 
-        # Map back to articles
-        scored_articles = []
-        for res in results:
-            idx = res.get('id')
-            if isinstance(idx, int) and 0 <= idx < len(articles):
-                original = articles[idx]
-                scored_articles.append({
-                    "title": original.get("title"),
-                    "url": original.get("url"),
-                    "source": original.get("source"),
-                    "summary": original.get("summary", ""),
-                    "score": res.get("score", 0),
-                    "reasoning": res.get("reasoning", ""),
-                    "relevance": res.get("relevance", "low")
-                })
-        
-        # Sort by index to maintain order? Or simply return what we got.
-        # It's safer to return a list of same length if possible, filling missing with 0 scores?
-        # For simplicity, let's just return what matched.
-        return scored_articles
-        
-    except Exception as e:
-        print(f"Error batch scoring: {e}", file=sys.stderr)
-        return []
+        parsed = {}
+        if response:
+            try:
+                parsed = _parse_batch_response(response.text or "", len(subset))
+            except Exception as e:
+                print(f"Error parsing batch response: {e}", file=sys.stderr)
+        else:
+            print(f"Error batch scoring: No response from Gemini API for {len(subset)} article(s)", file=sys.stderr)
+
+        for local_id, res in parsed.items():
+            original = subset[local_id]
+            scored[indices[local_id]] = {
+                "title": original.get("title"),
+                "url": original.get("url"),
+                "source": original.get("source"),
+                "summary": original.get("summary", ""),
+                "score": res.get("score", 0),
+                "reasoning": res.get("reasoning", ""),
+                "relevance": res.get("relevance", "low")
+            }
+
+        missing = [indices[j] for j in range(len(indices)) if j not in parsed]
+        if not missing:
+            continue
+
+        if parsed:
+            # Partial response: ask again for the missing IDs only
+            print(f"Warning: {len(missing)} article(s) missing from batch response. Re-batching them.", file=sys.stderr)
+            pending.append((missing, 0))
+        elif failures + 1 < max_attempts:
+            pending.append((missing, failures + 1))
+        elif len(missing) > 1:
+            half = len(missing) // 2
+            print(f"Warning: Batch of {len(missing)} failed repeatedly. Bisecting.", file=sys.stderr)
+            # Halves inherit the failure count so a persistently bad article is isolated quickly
+            pending.append((missing[:half], failures))
+            pending.append((missing[half:], failures))
+        else:
+            title = articles[missing[0]].get('title', 'Unknown')
+            print(f"Error: Giving up on scoring '{title}'.", file=sys.stderr)
+
+    if calls > 1:
+        print(f"Batch scoring used {calls} requests for {len(articles)} articles ({len(scored)} scored).")
+
+    return [scored[i] for i in sorted(scored)]
 
 def main():
     parser = argparse.ArgumentParser(description="Score articles for relevance to LogiShift.")
     parser.add_argument("--input", type=str, help="Path to JSON file with articles (from collector.py)", required=True)
     parser.add_argument("--threshold", type=int, default=80, help="Minimum score to pass (default: 80)")
     parser.add_argument("--output", type=str, help="Output file for scored articles (optional)")
-    parser.add_argument("--model", type=str, default="gemini-3-flash-preview", help="Gemini model to use")
+    parser.add_argument("--model", type=str, default=None, help="Gemini model to use (default: routed by task)")
     
     args = parser.parse_args()
     
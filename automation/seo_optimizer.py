@@ -12,14 +12,14 @@ import re
 import json
 from datetime import datetime
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client
 except ImportError:
-    from gemini_client import GeminiClient
+    from gemini_client import get_client
 
 
 class SEOOptimizer:
     def __init__(self, client=None):
-        self.gemini = client if client else GeminiClient()
+        self.gemini = client if client else get_client()
     
     def generate_meta_description(self, title, content, keyword):
         """
@@ -49,7 +49,7 @@ class SEOOptimizer:
 """
         
         try:
-            response = self.gemini.generate_content(prompt)
+            response = self.gemini.generate_content(prompt, task="seo_meta")
             meta_desc = response.text.strip()
             
             # Ensure length is within bounds
@@ -1,5 +1,4 @@
 import os
-import tweepy
 from dotenv import load_dotenv
 
 # Try importing ThreadsClient, graceful fail if file missing during transition
@@ -31,6 +30,8 @@ class SNSClient:
         """Authenticate with X API v2"""
         if self.x_api_key and self.x_api_secret and self.x_access_token and self.x_access_token_secret:
             try:
+                # Imported only when X credentials are configured
+                import tweepy
                 self.x_client = tweepy.Client(
                     consumer_key=self.x_api_key,
                     consumer_secret=self.x_api_secret,
@@ -9,13 +9,14 @@ Adds LogiShift perspective (DX Evangelist viewpoint).
 import os
 import sys
 import json
+from typing import Optional
 from dotenv import load_dotenv
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_client
 
 SUMMARIZATION_PROMPT = """あなたは物流業界のDXエバンジェリスト「LogiShift編集長」です。
 以下の記事を要約し、LogiShift読者（物流担当者・経営層）向けに重要な情報を抽出してください。
@@ -43,14 +44,14 @@ SUMMARIZATION_PROMPT = """あなたは物流業界のDXエバンジェリスト
 """
 
 
-def summarize_article(content: str, title: str, model_name: str = "gemini-3-flash-preview", client=None) -> dict:
+def summarize_article(content: str, title: str, model_name: Optional[str] = None, client=None) -> dict:
     """
     Summarize article content and extract key facts.
     
     Args:
         content: Article content
         title: Article title
-        model_name: Gemini model to use
+        model_name: Gemini model to use (default: routed "summarize" model)
         client: GeminiClient instance (optional)
     
     Returns:
@@ -61,7 +62,7 @@ def summarize_article(content: str, title: str, model_name: str = "gemini-3-flas
     
     try:
         if client is None:
-            client = GeminiClient()
+            client = get_client()
     except Exception as e:
         print(f"Error initializing GeminiClient: {e}")
         return {
@@ -77,7 +78,7 @@ def summarize_article(content: str, title: str, model_name: str = "gemini-3-flas
     
     try:
         # Use GeminiClient's generate_content which has retry logic
-        response = client.generate_content(prompt, model=model_name)
+        response = client.generate_content(prompt, model=model_name, task="summarize")
         
         if not response:
             raise Exception("No response from Gemini API")
@@ -121,7 +122,7 @@ def main():
     parser = argparse.ArgumentParser(description="Summarize article content")
     parser.add_argument("--title", type=str, required=True, help="Article title")
     parser.add_argument("--content", type=str, required=True, help="Article content")
-    parser.add_argument("--model", type=str, default="gemini-2.0-flash-exp", help="Gemini model")
+    parser.add_argument("--model", type=str, default=None, help="Gemini model (default: routed by task)")
     
     args = parser.parse_args()
     
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Run Tracing for LogiShift Automation
+
+Lightweight per-stage instrumentation:
+- Wall-clock duration per stage (and per article)
+- Gemini calls, models, input/output tokens and retry counts, attributed to the
+  innermost open stage of the calling thread (GeminiClient reports every response
+  via record_gemini_call)
+
+Records are kept in memory and, once start_run() is called, appended to a JSON
+lines file as each stage finishes.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+
+
+def usage_from_response(response):
+    """Extract (input_tokens, output_tokens) from a google-genai response."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    input_tokens = getattr(usage, "prompt_token_count", None) or 0
+    # Thinking tokens are billed as output
+    output_tokens = (getattr(usage, "candidates_token_count", None) or 0) + (getattr(usage, "thoughts_token_count", None) or 0)
+    return input_tokens, output_tokens
+
+
+class Tracer:
+    def __init__(self):
+        self.run_id = None
+        self.path = None
+        self.records = []
+        # Open stages per thread, so work running in background threads is attributed correctly
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        # Gemini usage that happened outside any stage
+        self._untracked = self._new_record("(untracked)", None)
+
+    @staticmethod
+    def _new_record(name, article):
+        return {
+            "stage": name,
+            "article": article,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "duration_s": 0.0,
+            "status": "ok",
+            "gemini_calls": 0,
+            "models": {},
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "retries": 0,
+        }
+
+    def start_run(self, trace_dir=DEFAULT_TRACE_DIR, run_id=None):
+        """Start writing records to <trace_dir>/<run_id>.jsonl."""
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(trace_dir, exist_ok=True)
+        self.path = os.path.join(trace_dir, f"{self.run_id}.jsonl")
+        return self.path
+
+    def reset(self):
+        """Drop in-memory records (e.g. between benchmark scenarios)."""
+        with self._lock:
+            self.records = []
+            self._local = threading.local()
+            self._untracked = self._new_record("(untracked)", None)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def stage(self, name, article=None):
+        """
+        Time a stage. Nested stages inherit the parent's article; Gemini usage
+        is attributed to the innermost stage only. Stages opened in another
+        thread do not nest, so pass article explicitly there.
+        """
+        stack = self._stack()
+        if article is None and stack:
+            article = stack[-1]["article"]
+        record = self._new_record(name, article)
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "error"
+            raise
+        finally:
+            record["duration_s"] = round(time.perf_counter() - start, 3)
+            if record in stack:
+                stack.remove(record)
+            with self._lock:
+                self.records.append(record)
+                self._write(record)
+
+    def record_gemini_call(self, model, response=None, retries=0):
+        """Attribute one Gemini call to the current stage."""
+        input_tokens, output_tokens = usage_from_response(response)
+        stack = self._stack()
+        with self._lock:
+            record = stack[-1] if stack else self._untracked
+            record["gemini_calls"] += 1
+            record["models"][model] = record["models"].get(model, 0) + 1
+            record["input_tokens"] += input_tokens
+            record["output_tokens"] += output_tokens
+            record["retries"] += retries
+
+    def _write(self, record):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"run_id": self.run_id, **record}, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Warning: Failed to write trace record: {e}")
+
+    def summary(self):
+        """Aggregate finished records by stage name (in first-seen order)."""
+        rows = {}
+        records = list(self.records)
+        if self._untracked["gemini_calls"]:
+            records.append(self._untracked)
+        for r in records:
+            row = rows.setdefault(r["stage"], {"stage": r["stage"], "count": 0, "duration_s": 0.0,
+                                               "gemini_calls": 0, "input_tokens": 0, "output_tokens": 0,
+                                               "retries": 0, "errors": 0})
+            row["count"] += 1
+            row["duration_s"] += r["duration_s"]
+            row["gemini_calls"] += r["gemini_calls"]
+            row["input_tokens"] += r["input_tokens"]
+            row["output_tokens"] += r["output_tokens"]
+            row["retries"] += r["retries"]
+            row["errors"] += r["status"] == "error"
+        return list(rows.values())
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print("\n=== Run Trace Summary ===")
+        print(f"{'Stage':<24}{'Count':>6}{'Time(s)':>10}{'Calls':>7}{'In tok':>10}{'Out tok':>10}{'Retry':>7}{'Err':>5}")
+        for r in rows:
+            print(f"{r['stage'][:23]:<24}{r['count']:>6}{r['duration_s']:>10.1f}{r['gemini_calls']:>7}"
+                  f"{r['input_tokens']:>10}{r['output_tokens']:>10}{r['retries']:>7}{r['errors']:>5}")
+        print("(Nested stages are also included in their parent's time.)")
+        if self.path:
+            print(f"Trace written to: {self.path}")
+
+
+# Process-wide tracer used by all modules
+tracer = Tracer()
+
+
+def stage(name, article=None):
+    return tracer.stage(name, article=article)
+
+
+def record_gemini_call(model, response=None, retries=0):
+    tracer.record_gemini_call(model, response=response, retries=retries)
@@ -7,9 +7,12 @@ Supports major logistics news sources with fallback to Gemini URL reading.
 """
 
 import requests
-from bs4 import BeautifulSoup
 from typing import Dict, Optional
 import sys
+try:
+    from automation import fixture_archive
+except ImportError:
+    import fixture_archive
 
 # Content selectors for each source
 CONTENT_SELECTORS = {
@@ -109,62 +112,15 @@ def extract_content(url: str, source: str) -> Dict[str, str]:
     """
     print(f"Extracting content from {source}: {url}")
     
-    # Get selectors for this source
-    selectors = CONTENT_SELECTORS.get(source)
-    
-    if not selectors:
-        print(f"Warning: No selectors defined for source '{source}', using generic extraction")
-        selectors = {
-            "content": "article, div.content, div.post-content, div.entry-content",
-            "title": "h1",
-            "author": "span.author, a.author, span.author-name",
-        }
-    
     try:
-        # Fetch URL
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Parse HTML
-        soup = BeautifulSoup(response.content, 'lxml')
+        # Fetch URL (recorded/replayed in fixture mode, see fixture_archive.py)
+        html, _ = fixture_archive.fetch(fixture_archive.KIND_PAGE, url, source, lambda: _download(url))
         
-        # Extract title
-        title_elem = soup.select_one(selectors["title"])
-        title = title_elem.get_text(strip=True) if title_elem else "No Title"
-        
-        # Extract content
-        content_elem = soup.select_one(selectors["content"])
-        if content_elem:
-            # Remove script and style tags
-            for tag in content_elem.find_all(['script', 'style', 'nav', 'aside']):
-                tag.decompose()
-            content = content_elem.get_text(separator='\n', strip=True)
-        
-        # If content selector found nothing or text is empty, try fallback
-        if not content_elem or not content:
-            print(f"Warning: Content selector '{selectors['content']}' yielded empty result. Using fallback.")
-            # Fallback: get all paragraphs
-            paragraphs = soup.find_all('p')
-            content = '\n'.join([p.get_text(strip=True) for p in paragraphs])
-        
-        # Extract author
-        author_elem = soup.select_one(selectors["author"])
-        author = author_elem.get_text(strip=True) if author_elem else "Unknown"
-        
-        result = {
-            "title": title,
-            "content": content,
-            "author": author,
-            "url": url,
-        }
-        
-        print(f"Successfully extracted: {len(content)} chars")
+        result = parse_content(html, url, source)
+        print(f"Successfully extracted: {len(result['content'])} chars")
         return result
         
-    except requests.RequestException as e:
+    except (requests.RequestException, fixture_archive.FixtureNotFound) as e:
         print(f"Error fetching URL: {e}")
         return {
             "title": "Error",
@@ -182,6 +138,75 @@ def extract_content(url: str, source: str) -> Dict[str, str]:
         }
 
 
+def _download(url: str) -> bytes:
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+    }
+    response = requests.get(url, headers=headers, timeout=10)
+    response.raise_for_status()
+    return response.content
+
+
+def parse_content(html: bytes, url: str, source: str) -> Dict[str, str]:
+    """
+    Extract title, content and author from an article page.
+    
+    Args:
+        html: Raw page bytes
+        url: Article URL
+        source: Source name (selects CSS selectors)
+    
+    Returns:
+        Dictionary with keys: title, content, author, url
+    """
+    # Get selectors for this source
+    selectors = CONTENT_SELECTORS.get(source)
+    
+    if not selectors:
+        print(f"Warning: No selectors defined for source '{source}', using generic extraction")
+        selectors = {
+            "content": "article, div.content, div.post-content, div.entry-content",
+            "title": "h1",
+            "author": "span.author, a.author, span.author-name",
+        }
+    
+    # Parse HTML (bs4/lxml imported on first use)
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'lxml')
+    
+    # Extract title
+    title_elem = soup.select_one(selectors["title"])
+    title = title_elem.get_text(strip=True) if title_elem else "No Title"
+    
+    # Extract content
+    content_elem = soup.select_one(selectors["content"])
+    if content_elem:
+        # Remove script and style tags
+        for tag in content_elem.find_all(['script', 'style', 'nav', 'aside']):
+            tag.decompose()
+        content = content_elem.get_text(separator='\n', strip=True)
+    
+    # If content selector found nothing or text is empty, try fallback
+    if not content_elem or not content:
+        print(f"Warning: Content selector '{selectors['content']}' yielded empty result. Using fallback.")
+        # Fallback: get all paragraphs
+        paragraphs = soup.find_all('p')
+        content = '\n'.join([p.get_text(strip=True) for p in paragraphs])
+    
+    # Extract author
+    author_elem = soup.select_one(selectors["author"])
+    author = author_elem.get_text(strip=True) if author_elem else "Unknown"
+    
+    result = {
+        "title": title,
+        "content": content,
+        "author": author,
+        "url": url,
+    }
+    
+    return result
+
+
 def main():
     """Test URL extraction"""
     import argparse
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Gemini Usage Ledger for LogiShift
+
+Persists usage metadata for every Gemini request (model, tokens, images, retries,
+estimated cost) to a JSON lines ledger, provides daily rollups, and implements a
+daily budget guard used to downgrade or skip non-critical calls.
+
+Configuration (.env):
+- GEMINI_DAILY_BUDGET_USD: Daily budget in USD (unset = no guard)
+- GEMINI_BUDGET_NEAR_RATIO: Share of the budget at which non-critical calls are
+  downgraded (default: 0.8)
+- GEMINI_USAGE_LEDGER: Ledger path (default: automation/usage_ledger.jsonl)
+"""
+
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "usage_ledger.jsonl")
+
+# Approximate list prices in USD: (per 1M input tokens, per 1M output tokens) or per image.
+# Estimates only - update when pricing changes.
+TOKEN_PRICES = {
+    "gemini-3.1-pro-preview": (2.00, 12.00),
+    "gemini-3-flash-preview": (0.50, 3.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash-exp": (0.10, 0.40),
+}
+IMAGE_PRICES = {
+    "gemini-2.5-flash-image": 0.039,
+    "imagen-3.0-generate-001": 0.04,
+}
+DEFAULT_TOKEN_PRICE = (2.00, 12.00)
+# Input tokens served from a context cache (explicit or implicit) are billed at this share of the input price
+CACHED_INPUT_RATIO = 0.1
+
+BUDGET_OK = "ok"
+BUDGET_NEAR = "near"
+BUDGET_EXCEEDED = "exceeded"
+
+
+def estimate_cost(model, input_tokens=0, output_tokens=0, images=0, cached_tokens=0):
+    """cached_tokens is the part of input_tokens served from a context cache."""
+    if model in IMAGE_PRICES:
+        return IMAGE_PRICES[model] * images
+    in_price, out_price = TOKEN_PRICES.get(model, DEFAULT_TOKEN_PRICE)
+    cached_tokens = min(cached_tokens, input_tokens)
+    billed_input = input_tokens - cached_tokens + cached_tokens * CACHED_INPUT_RATIO
+    return (billed_input * in_price + output_tokens * out_price) / 1_000_000
+
+
+def _cached_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return (getattr(usage, "cached_content_token_count", None) or 0) if usage is not None else 0
+
+
+def _count_images(response):
+    """Number of images in a generate_content (inline_data) or generate_images response."""
+    if response is None:
+        return 0
+    generated = getattr(response, "generated_images", None)
+    if generated:
+        return len(generated)
+    try:
+        return sum(1 for part in (response.parts or []) if getattr(part, "inline_data", None) is not None)
+    except Exception:
+        return 0
+
+
+class UsageLedger:
+    def __init__(self, path=None):
+        self.path = path or os.getenv("GEMINI_USAGE_LEDGER", DEFAULT_LEDGER_PATH)
+        budget = os.getenv("GEMINI_DAILY_BUDGET_USD")
+        self.daily_budget = float(budget) if budget else None
+        self.near_ratio = float(os.getenv("GEMINI_BUDGET_NEAR_RATIO", "0.8"))
+        self._lock = threading.Lock()
+        self._today = None
+        self._today_cost = 0.0
+
+    def _load_today(self):
+        """Sum today's spend from the ledger once per day (cached in memory afterwards)."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        if self._today == today:
+            return
+        self._today = today
+        self._today_cost = sum(e.get("cost_usd", 0.0) for e in self.entries() if e.get("date") == today)
+
+    def entries(self):
+        if not os.path.exists(self.path):
+            return []
+        rows = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue
+        return rows
+
+    def record(self, model, input_tokens=0, output_tokens=0, retries=0, response=None, ok=True):
+        """Append one request to the ledger and return its estimated cost."""
+        images = _count_images(response) if model in IMAGE_PRICES else 0
+        cached_tokens = _cached_tokens(response)
+        cost = estimate_cost(model, input_tokens, output_tokens, images, cached_tokens)
+        now = datetime.now()
+        entry = {
+            "ts": now.isoformat(timespec="seconds"),
+            "date": now.strftime("%Y-%m-%d"),
+            "model": model,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "output_tokens": output_tokens,
+            "images": images,
+            "retries": retries,
+            "ok": ok,
+            "cost_usd": round(cost, 6),
+        }
+        with self._lock:
+            self._load_today()
+            if self._today == entry["date"]:
+                self._today_cost += cost
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Warning: Failed to write usage ledger: {e}")
+        return cost
+
+    def spent_today(self):
+        with self._lock:
+            self._load_today()
+            return self._today_cost
+
+    def budget_status(self):
+        """Return BUDGET_OK, BUDGET_NEAR or BUDGET_EXCEEDED for today's spend."""
+        if not self.daily_budget:
+            return BUDGET_OK
+        spent = self.spent_today()
+        if spent >= self.daily_budget:
+            return BUDGET_EXCEEDED
+        if spent >= self.daily_budget * self.near_ratio:
+            return BUDGET_NEAR
+        return BUDGET_OK
+
+    def daily_rollup(self):
+        """Return {date: {model: {"requests", "input_tokens", "cached_tokens", "output_tokens", "images", "retries", "cost_usd"}}}."""
+        rollup = {}
+        for e in self.entries():
+            day = rollup.setdefault(e.get("date", "unknown"), {})
+            row = day.setdefault(e.get("model", "unknown"), {"requests": 0, "input_tokens": 0, "cached_tokens": 0,
+                                                             "output_tokens": 0, "images": 0, "retries": 0, "cost_usd": 0.0})
+            row["requests"] += 1
+            for key in ("input_tokens", "cached_tokens", "output_tokens", "images", "retries", "cost_usd"):
+                row[key] += e.get(key, 0) or 0
+        return rollup
+
+
+# Process-wide ledger used by GeminiClient
+ledger = UsageLedger()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show Gemini usage and estimated cost per day.")
+    parser.add_argument("--days", type=int, default=7, help="Number of most recent days to show (default: 7)")
+    args = parser.parse_args()
+
+    rollup = ledger.daily_rollup()
+    if not rollup:
+        print(f"No usage recorded yet ({ledger.path}).")
+        return
+
+    print(f"{'Date':<12}{'Model':<28}{'Reqs':>6}{'In tok':>12}{'Cached':>12}{'Out tok':>12}{'Imgs':>6}{'Retry':>7}{'USD':>10}")
+    for date in sorted(rollup)[-args.days:]:
+        total = 0.0
+        for model, row in sorted(rollup[date].items()):
+            total += row["cost_usd"]
+            print(f"{date:<12}{model[:27]:<28}{row['requests']:>6}{row['input_tokens']:>12}{row['cached_tokens']:>12}{row['output_tokens']:>12}"
+                  f"{row['images']:>6}{row['retries']:>7}{row['cost_usd']:>10.3f}")
+        print(f"{date:<12}{'TOTAL':<28}{'':>55}{total:>10.3f}")
+
+    if ledger.daily_budget:
+        print(f"\nToday: ${ledger.spent_today():.3f} of ${ledger.daily_budget:.2f} budget ({ledger.budget_status()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,31 @@
 import os
+import json
+import hashlib
+import mimetypes
 import requests
 import base64
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Local map of content hash -> uploaded media, so retries/re-publishes reuse existing attachments
+DEFAULT_MEDIA_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "media_cache.json")
+
+# Keep-alive connections kept open to the site (shared by concurrent callers)
+WP_POOL_SIZE = 10
+
+# Sub-requests per /batch/v1 call (WordPress default maximum, see rest_get_max_batch_size)
+META_BATCH_SIZE = 25
+
+def file_sha256(file_path):
+    """Hash a file in chunks without loading it fully into memory."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 class WordPressClient:
     def __init__(self):
         self.wp_url = os.getenv("WP_URL")
@@ -17,6 +38,39 @@ class WordPressClient:
         self.auth = (self.wp_user, self.wp_password)
         # Use query param format for default permalink structure
         self.api_url = f"{self.wp_url}/?rest_route=/wp/v2"
+        self.media_cache_path = os.getenv("WP_MEDIA_CACHE", DEFAULT_MEDIA_CACHE_PATH)
+        # One pooled session per client: requests reuse TLS connections instead of reconnecting
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WP_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Set once the site answers 404 for /batch/v1 (WordPress < 5.6)
+        self._batch_unsupported = False
+
+    def _load_media_cache(self):
+        """Return {sha256: {"id", "source_url"}} for this site."""
+        try:
+            with open(self.media_cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get(self.wp_url, {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_media_cache_entry(self, content_hash, entry):
+        """Store the attachment for a file hash (entry None removes it)."""
+        try:
+            data = {}
+            if os.path.exists(self.media_cache_path):
+                with open(self.media_cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            site = data.setdefault(self.wp_url, {})
+            if entry is None:
+                site.pop(content_hash, None)
+            else:
+                site[content_hash] = entry
+            with open(self.media_cache_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Failed to update media cache: {e}")
 
     def create_post(self, title, content, status="draft", categories=None, tags=None, date=None, excerpt=None, meta=None, featured_media=None):
         """
@@ -56,7 +110,7 @@ class WordPressClient:
             data["featured_media"] = featured_media
 
         try:
-            response = requests.post(url, json=data, auth=self.auth)
+            response = self.session.post(url, json=data, auth=self.auth)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -94,7 +148,7 @@ class WordPressClient:
             data["parent"] = parent
 
         try:
-            response = requests.post(url, json=data, auth=self.auth)
+            response = self.session.post(url, json=data, auth=self.auth)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -108,7 +162,7 @@ class WordPressClient:
         try:
             # Use query param format for default permalink structure
             url = f"{self.wp_url}/?rest_route=/wp/v2/categories&slug={slug}"
-            response = requests.get(url, auth=self.auth)
+            response = self.session.get(url, auth=self.auth)
             response.raise_for_status()
             data = response.json()
             if data:
@@ -123,7 +177,7 @@ class WordPressClient:
         try:
             # Try to get existing tag
             url = f"{self.wp_url}/?rest_route=/wp/v2/tags&slug={slug}"
-            response = requests.get(url, auth=self.auth)
+            response = self.session.get(url, auth=self.auth)
             response.raise_for_status()
             data = response.json()
             if data:
@@ -132,7 +186,7 @@ class WordPressClient:
             # Create if not exists
             create_url = f"{self.api_url}/tags"
             create_data = {"name": slug, "slug": slug}
-            response = requests.post(create_url, json=create_data, auth=self.auth)
+            response = self.session.post(create_url, json=create_data, auth=self.auth)
             response.raise_for_status()
             return response.json()['id']
             
@@ -171,7 +225,7 @@ class WordPressClient:
             if after:
                 params["after"] = after
                 
-            response = requests.get(url, params=params, auth=self.auth)
+            response = self.session.get(url, params=params, auth=self.auth)
             response.raise_for_status()
             return response.json()
             
@@ -181,6 +235,140 @@ class WordPressClient:
                 print(f"Response content: {e.response.text}")
             return None
 
+    def iter_posts(self, status="publish", after=None, include=None, fields=None, per_page=100, order="desc"):
+        """
+        Yield every post matching the filters, following WordPress pagination
+        (X-WP-TotalPages) instead of stopping at the first page.
+
+        Args:
+            status: Filter by post status (default: "publish")
+            after: ISO 8601 date string to filter posts published after this date
+            include: List of post IDs to restrict the result to
+            fields: List of fields to return (_fields), e.g. ["id", "title", "meta"];
+                    omitting "content" keeps list responses small
+            per_page: Page size (WordPress maximum is 100)
+            order: "desc" (newest first) or "asc" (oldest first) by publication date
+        """
+        url = f"{self.api_url}/posts"
+        params = {
+            "per_page": per_page,
+            "status": status,
+            "orderby": "date",
+            "order": order,
+            "context": "edit"
+        }
+        if after:
+            params["after"] = after
+        if include:
+            params["include"] = ",".join(str(i) for i in include)
+        if fields:
+            params["_fields"] = ",".join(fields)
+
+        page = 1
+        while True:
+            params["page"] = page
+            try:
+                response = self.session.get(url, params=params, auth=self.auth)
+                response.raise_for_status()
+            except Exception as e:
+                print(f"Error fetching posts (page {page}): {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    print(f"Response content: {e.response.text}")
+                return
+            posts = response.json()
+            yield from posts
+            total_pages = int(response.headers.get("X-WP-TotalPages") or 0)
+            if len(posts) < per_page or (total_pages and page >= total_pages):
+                return
+            page += 1
+
+    def update_post(self, post_id, **fields):
+        """
+        Update fields of an existing post (e.g. content, title, meta).
+        
+        Returns:
+            Response JSON or None
+        """
+        url = f"{self.api_url}/posts/{post_id}"
+        try:
+            response = self.session.post(url, json=fields, auth=self.auth)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error updating post {post_id}: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response content: {e.response.text}")
+            return None
+
+    def update_post_meta(self, post_id, meta):
+        """
+        Update meta fields of an existing post.
+        
+        Args:
+            post_id: ID of the post
+            meta: Dictionary of meta fields (e.g., {"ai_structured_summary": "..."})
+            
+        Returns:
+            True if the update succeeded, False otherwise
+        """
+        url = f"{self.api_url}/posts/{post_id}"
+        try:
+            response = self.session.post(url, json={"meta": meta}, auth=self.auth)
+            response.raise_for_status()
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"Error updating meta of post {post_id}: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response content: {e.response.text}")
+            return False
+
+    def update_posts_meta(self, updates, batch_size=META_BATCH_SIZE):
+        """
+        Update meta fields of many posts with the REST batch endpoint (/batch/v1,
+        WordPress 5.6+), sending up to batch_size updates per request. Falls back
+        to one update_post_meta call per post if the site has no batch endpoint.
+
+        Args:
+            updates: List of (post_id, meta dict) pairs
+            batch_size: Updates per request (WordPress accepts 25 by default)
+
+        Returns:
+            dict mapping post_id -> True if its update succeeded
+        """
+        results = {}
+        url = f"{self.wp_url}/?rest_route=/batch/v1"
+        for start in range(0, len(updates), batch_size):
+            chunk = updates[start:start + batch_size]
+            if self._batch_unsupported:
+                results.update({post_id: self.update_post_meta(post_id, meta) for post_id, meta in chunk})
+                continue
+            data = {
+                "validation": "normal",
+                "requests": [{"method": "POST", "path": f"/wp/v2/posts/{post_id}", "body": {"meta": meta}}
+                             for post_id, meta in chunk]
+            }
+            try:
+                response = self.session.post(url, json=data, auth=self.auth)
+                if response.status_code == 404:
+                    print("REST batch endpoint not available; updating post meta one by one.")
+                    self._batch_unsupported = True
+                    results.update({post_id: self.update_post_meta(post_id, meta) for post_id, meta in chunk})
+                    continue
+                response.raise_for_status()
+                responses = response.json().get("responses", [])
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Error in batch meta update ({len(chunk)} posts): {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    print(f"Response content: {e.response.text}")
+                results.update({post_id: False for post_id, _ in chunk})
+                continue
+            for (post_id, _), item in zip(chunk, responses + [None] * (len(chunk) - len(responses))):
+                ok = bool(item) and 200 <= item.get("status", 500) < 300
+                if not ok:
+                    print(f"Error updating meta of post {post_id}: {(item or {}).get('body')}")
+                results[post_id] = ok
+        return results
+
     def get_popular_posts(self, days=30, limit=20):
         """
         Retrieve popular posts from custom endpoint.
@@ -192,7 +380,7 @@ class WordPressClient:
                 "limit": limit
             }
             
-            response = requests.get(url, params=params, auth=self.auth)
+            response = self.session.get(url, params=params, auth=self.auth)
             response.raise_for_status()
             return response.json()
             
@@ -200,33 +388,106 @@ class WordPressClient:
             print(f"Error fetching popular posts: {e}")
             return []
 
-    def upload_media(self, file_path, alt_text=""):
+    def _reuse_cached_media(self, content_hash, cached, alt_text="", title=None, caption=None):
+        """
+        Check that a cached attachment still exists and bring its alt text / title /
+        caption up to date. Returns the media dict, or None when it was deleted on
+        the site (the stale cache entry is dropped).
+        """
+        url = f"{self.api_url}/media/{cached['id']}"
+        media = {'id': cached['id'], 'source_url': cached.get('source_url')}
+        try:
+            response = self.session.get(url, params={"_fields": "id,source_url,alt_text,title,caption", "context": "edit"},
+                                        auth=self.auth)
+            if response.status_code in (404, 410):
+                print(f"Cached media ID {cached['id']} no longer exists, uploading again")
+                self._save_media_cache_entry(content_hash, None)
+                return None
+            response.raise_for_status()
+            current = response.json()
+        except requests.exceptions.RequestException as e:
+            # Could not verify; the cached attachment is still the best guess
+            print(f"Warning: Could not check cached media ID {cached['id']}: {e}")
+            return media
+
+        media['source_url'] = current.get('source_url') or media['source_url']
+        wanted = {'alt_text': alt_text, 'title': title, 'caption': caption}
+        updates = {}
+        for field, value in wanted.items():
+            if not value:
+                continue
+            existing = current.get(field)
+            if isinstance(existing, dict):
+                existing = existing.get('raw', existing.get('rendered'))
+            if existing != value:
+                updates[field] = value
+        if updates:
+            try:
+                self.session.post(url, json=updates, auth=self.auth).raise_for_status()
+                print(f"Updated {', '.join(updates)} of media ID {cached['id']}")
+            except requests.exceptions.RequestException as e:
+                print(f"Warning: Failed to update media {cached['id']}: {e}")
+        return media
+
+    def upload_media(self, file_path, alt_text="", dedup=True, title=None, caption=None):
         """
-        Upload a media file to WordPress.
+        Upload a media file to WordPress in a single request.
+        
+        The file body is streamed from disk (raw body + Content-Disposition) and
+        alt text / title / caption are sent as request parameters, so no follow-up
+        update call is needed.
+        
+        Identical files (by SHA-256) already uploaded to this site are not sent again;
+        the existing attachment is returned instead (after checking it still exists
+        and updating its alt text / title / caption if they differ).
         
         Args:
             file_path: Path to the file to upload
             alt_text: Alternative text for the image
+            dedup: Check the local media cache before uploading
+            title: Attachment title (optional, WordPress defaults to the filename)
+            caption: Attachment caption (optional)
             
         Returns:
             dict with 'id' and 'source_url' if successful, None otherwise
         """
         try:
+            content_hash = file_sha256(file_path)
+            if dedup:
+                cached = self._load_media_cache().get(content_hash)
+                if cached and cached.get('id'):
+                    media = self._reuse_cached_media(content_hash, cached, alt_text=alt_text, title=title, caption=caption)
+                    if media:
+                        print(f"Reusing existing media ID {cached['id']} for {os.path.basename(file_path)} (identical content)")
+                        return media
+
             url = f"{self.api_url}/media"
             
-            # Get filename
+            # Get filename and content type (hero images are usually WebP after post-processing)
             filename = os.path.basename(file_path)
+            mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
             
-            # Use multipart upload which is often more robust
+            headers = {
+                'Content-Type': mime_type,
+                # Bytes so non-ASCII (Japanese) filenames are passed through as UTF-8
+                'Content-Disposition': f'attachment; filename="{filename}"'.encode('utf-8'),
+                'Content-Length': str(os.path.getsize(file_path)),
+            }
+            params = {}
+            if alt_text:
+                params['alt_text'] = alt_text
+            if title:
+                params['title'] = title
+            if caption:
+                params['caption'] = caption
+            
+            # Passing the open file as data makes requests stream it instead of buffering
             with open(file_path, 'rb') as f:
-                files = {
-                    'file': (filename, f, 'image/png')
-                }
-                
-                # Upload file
-                response = requests.post(
+                response = self.session.post(
                     url,
-                    files=files,
+                    data=f,
+                    headers=headers,
+                    params=params,
                     auth=self.auth
                 )
             
@@ -234,17 +495,13 @@ class WordPressClient:
             
             result = response.json()
             
-            # Update alt text if provided
-            if alt_text and 'id' in result:
-                media_id = result['id']
-                update_url = f"{self.api_url}/media/{media_id}"
-                update_data = {"alt_text": alt_text}
-                requests.post(update_url, json=update_data, auth=self.auth)
-            
-            return {
+            media = {
                 'id': result.get('id'),
                 'source_url': result.get('source_url')
             }
+            if media['id']:
+                self._save_media_cache_entry(content_hash, media)
+            return media
             
         except Exception as e:
             print(f"Error uploading media {file_path}: {e}")
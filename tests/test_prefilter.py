@@ -0,0 +1,34 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation.prefilter import PreFilter, LEXICON_EN, LEXICON_JA, SOURCE_PRIORS
+
+
+class DefaultWeightsTest(unittest.TestCase):
+    """The untrained rule: a neutral or mildly negative source needs at least one lexicon hit."""
+
+    def setUp(self):
+        self.prefilter = PreFilter(model_path=None)
+        self.weakest_ja = min(LEXICON_JA, key=LEXICON_JA.get)
+        self.weakest_en = min(LEXICON_EN, key=LEXICON_EN.get)
+        self.sources = ["unknown_feed"] + [s for s, prior in SOURCE_PRIORS.items() if -0.3 <= prior <= 0.0]
+
+    def _kept(self, summary, source):
+        kept, _ = self.prefilter.filter([{"title": "News", "summary": summary, "source": source}])
+        return bool(kept)
+
+    def test_no_lexicon_hit_is_dropped(self):
+        for source in self.sources:
+            self.assertFalse(self._kept("Apple announces a new phone lineup", source), source)
+
+    def test_single_weakest_hit_passes(self):
+        for source in self.sources:
+            self.assertTrue(self._kept(f"New {self.weakest_en} rules announced", source), source)
+            self.assertTrue(self._kept(f"{self.weakest_ja}に関する新ルール", source), source)
+
+
+if __name__ == "__main__":
+    unittest.main()